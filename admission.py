@@ -0,0 +1,71 @@
+# admission.py
+# ضبط القبول لكل عامل أثناء الإغراق. أولوية الحدث تُعرف من المطابقة (في الذاكرة، ميكروثوانٍ)
+# قبل أي نداء صادر: تحذير المنع أولًا، ثم الترحيب، ثم الرد التلقائي. لكل أولوية حصة من ميزانيتين:
+#   - الحمل: الأحداث المقبولة التي تنتظر في الطابور أو يجري إرسالها الآن
+#   - التأخير: عمر الحدث منذ أنشأته LINE؛ مع عمّال gunicorn المتزامنة (طلب واحد في كل مرة)
+#     هو الإشارة الوحيدة التي تكبر تحت الضغط، لأن الطلبات المنتظرة تتراكم خارج العملية
+# الحدث الذي يتجاوز حصته يُترك دون نداء صادر، فينتهي فورًا ويتفرّغ العامل لما بعده.
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+MODERATION = "moderation"
+WELCOME = "welcome"
+AUTO_REPLY = "auto_reply"
+
+# ترتيب المعالجة (الأصغر أولًا) في الطابور وداخل طلب /callback الواحد
+RANK = {MODERATION: 0, WELCOME: 1, AUTO_REPLY: 2}
+
+# نسبة كل ميزانية المتاحة لكل أولوية
+DEFAULT_SHARES = {MODERATION: 1.0, WELCOME: 0.75, AUTO_REPLY: 0.5}
+
+
+class AdmissionController:
+    """
+    admit(priority, timestamp) لا تحجب: True إن كان الحمل الحالي أقل من limit × حصة الأولوية
+    وعمر الحدث (timestamp بالملّي ثانية من LINE) لا يتجاوز max_lag × الحصة؛ وإلا يُعدّ في shed[priority].
+    check_load=False يفحص التأخير فقط (عند سحب حدث مقبول من الطابور).
+    handling() يحيط بإرسال حدث مقبول، و backlog دالة اختيارية لعدد الأحداث المنتظرة في الطابور.
+    limit <= 0 أو max_lag <= 0 يعطّل الميزانية المقابلة.
+    """
+
+    def __init__(self, limit: int, max_lag: float, shares: dict = None, backlog=None):
+        self.limit = limit
+        self.max_lag = max_lag
+        self.shares = dict(DEFAULT_SHARES, **(shares or {}))
+        self.backlog = backlog
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # العدّادات والقفل لكل عملية: العامل الجديد بعد fork يبدأ من الصفر
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.shed = dict.fromkeys(self.shares, 0)
+
+    def load(self) -> int:
+        return self.active + (self.backlog() if self.backlog else 0)
+
+    def admit(self, priority: str, timestamp=None, check_load: bool = True) -> bool:
+        share = self.shares[priority]
+        ok = True
+        if check_load and self.limit > 0:
+            ok = self.load() < max(1, int(self.limit * share))
+        if ok and timestamp and self.max_lag > 0:
+            ok = time.time() - timestamp / 1000.0 <= self.max_lag * share
+        if not ok:
+            with self._lock:
+                self.shed[priority] += 1
+        return ok
+
+    @contextmanager
+    def handling(self):
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
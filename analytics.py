@@ -0,0 +1,154 @@
+# analytics.py
+# عدّادات استخدام مفاتيح الردود وكلمات المنع: تُجمع في الذاكرة داخل كل عامل
+# (بلا أي كتابة على القرص مع الرسالة)، وتُفرَّغ دفعة واحدة إلى SQLite محلي كل flush_interval ثانية.
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class HitCounter:
+    """
+    hit(kind, key) لكل تطابق (kind مثل "reply" أو "forbidden")، و total(name) للعدّادات العامة
+    (عدد الرسائل المفحوصة، المطابقة ...). flush() يدمج المتراكم في القاعدة بعملية واحدة،
+    و counts(kind) / totals() تعيد مجموع كل العمّال (القاعدة + ما لم يُفرَّغ بعد في هذه العملية).
+    path=None: الذاكرة فقط (أرقام هذا العامل).
+    """
+
+    def __init__(self, path: str = None, flush_interval: float = 30.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = {}    # (kind, key) -> عدد
+        self._totals = {}     # name -> عدد
+        self._last = {}       # (kind, key) -> آخر وقت
+        self._lock = threading.Lock()
+        self._pid = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # ما تراكم في الأم يُفرَّغ من الأم نفسها
+        self._pending, self._totals, self._last = {}, {}, {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    # ---------- المسار الساخن ----------
+    def hit(self, kind: str, key):
+        if key is None:
+            return
+        self._ensure_flusher()
+        k = (kind, str(key))
+        with self._lock:
+            self._pending[k] = self._pending.get(k, 0) + 1
+            self._last[k] = time.time()
+
+    def total(self, name: str, n: int = 1):
+        self._ensure_flusher()
+        with self._lock:
+            self._totals[name] = self._totals.get(name, 0) + n
+
+    # ---------- التفريغ ----------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS hits ("
+            " kind TEXT NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL, last_hit REAL,"
+            " PRIMARY KEY (kind, key))"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        return conn
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            pending, totals, last = self._pending, self._totals, self._last
+            if not pending and not totals:
+                return
+            self._pending, self._totals, self._last = {}, {}, {}
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO hits (kind, key, count, last_hit) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(kind, key) DO UPDATE SET count = count + excluded.count,"
+                    " last_hit = max(coalesce(last_hit, 0), excluded.last_hit)",
+                    [(kind, key, n, last.get((kind, key))) for (kind, key), n in pending.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO totals (name, count) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET count = count + excluded.count",
+                    list(totals.items()),
+                )
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            log.exception("تعذّر حفظ عدّادات الاستخدام، ستُعاد المحاولة في الدورة التالية")
+            self._merge_back(pending, totals, last)
+
+    def _merge_back(self, pending, totals, last):
+        with self._lock:
+            for k, n in pending.items():
+                self._pending[k] = self._pending.get(k, 0) + n
+            for k, n in totals.items():
+                self._totals[k] = self._totals.get(k, 0) + n
+            for k, t in last.items():
+                self._last[k] = max(t, self._last.get(k, 0))
+
+    def _ensure_flusher(self):
+        if self._pid == os.getpid() or not self.path:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="analytics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    # ---------- القراءة (لوحة الإدارة) ----------
+    def counts(self, kind: str) -> dict:
+        """key -> عدد مرات التطابق."""
+        out = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                conn = self._connect()
+                try:
+                    for key, n in conn.execute("SELECT key, count FROM hits WHERE kind = ?", (kind,)):
+                        out[key] = n
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                log.exception("تعذّر قراءة عدّادات الاستخدام")
+        with self._lock:
+            for (k, key), n in self._pending.items():
+                if k == kind:
+                    out[key] = out.get(key, 0) + n
+        return out
+
+    def totals(self) -> dict:
+        out = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                conn = self._connect()
+                try:
+                    out.update(conn.execute("SELECT name, count FROM totals"))
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                log.exception("تعذّر قراءة عدّادات الاستخدام")
+        with self._lock:
+            for name, n in self._totals.items():
+                out[name] = out.get(name, 0) + n
+        return out
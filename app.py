@@ -1,4 +1,4 @@
-import os, json, re
+import os, json
 from flask import Flask, request, abort, redirect, url_for, render_template_string, session
 from dotenv import load_dotenv
 
@@ -24,13 +24,8 @@ handler = WebhookHandler(LINE_CHANNEL_SECRET)
 app = Flask(__name__)
 app.secret_key = FLASK_SECRET
 
-# === أدوات عربية بسيطة ===
-ARABIC_DIACRITICS = re.compile(r"[\u0617-\u061A\u064B-\u0652\u0670\u06D6-\u06ED]")
-def normalize_ar(text: str) -> str:
-    if not text: return ""
-    text = text.replace("أ","ا").replace("إ","ا").replace("آ","ا").replace("ة","ه")
-    text = ARABIC_DIACRITICS.sub("", text).replace("ـ","")
-    return re.sub(r"\s+"," ", text).strip().lower()
+# === المطابقة: نفس المحرك المُجمّع في helper.py (كاش + إعادة تحميل عند تغيّر الملف) ===
+from helper import reply_for_event, notify_changed
 
 # === تحميل/حفظ الكلمات ===
 def load_words():
@@ -42,14 +37,7 @@ def load_words():
 def save_words(data: dict):
     with open(WORDS_FILE, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
-
-def find_reply(user_text: str) -> str | None:
-    t = normalize_ar(user_text)
-    words = load_words()
-    for key, val in words.items():
-        if normalize_ar(key) in t:
-            return val
-    return None
+    notify_changed(WORDS_FILE)
 
 # === LINE Webhook ===
 @app.post("/callback")
@@ -64,8 +52,8 @@ def callback():
 
 @handler.add(MessageEvent, message=TextMessage)
 def handle_message(event):
-    incoming = event.message.text or ""
-    reply = find_reply(incoming)
+    # كل مفتاح في words.json يُطابق إن ورد داخل النص (contains_all)
+    reply = reply_for_event(event, contains_all=True)
     if reply is None:
         reply = "ما فهمت، جرّب كلمة مفتاحية أو ادخل لوحة الإدارة لتضيف كلمات."
     line_bot_api.reply_message(event.reply_token, TextSendMessage(text=reply))
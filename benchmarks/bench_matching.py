@@ -0,0 +1,208 @@
+# benchmarks/bench_matching.py
+# قياس أداء مسار المطابقة: normalize_ar و check_forbidden و get_auto_reply
+#
+#   python benchmarks/bench_matching.py                       # الأحجام 100 و 10k و 100k
+#   python benchmarks/bench_matching.py --sizes 100,10000 --messages 5000 --json bench.json
+#
+# لكل حجم تُولَّد ملفات words.json / replies.json / moderation.json اصطناعية في مجلد مؤقت،
+# ويُشغَّل القياس في عملية مستقلة (helper يقرأ المسارات من البيئة عند الاستيراد).
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_AR_LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهويءأإآىئؤة"
+_AR_DIACRITICS = "ًٌٍَُِّْ"
+_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_EMOJI = "🤍☀️🌙🙂🌹✔️🎉🤖👋"
+
+
+def _ar_word(rng, lo=3, hi=7):
+    w = []
+    for _ in range(rng.randint(lo, hi)):
+        w.append(rng.choice(_AR_LETTERS))
+        if rng.random() < 0.15:
+            w.append(rng.choice(_AR_DIACRITICS))
+    if rng.random() < 0.05:
+        w.insert(rng.randint(1, len(w)), "ـ")
+    return "".join(w)
+
+
+def _latin_word(rng):
+    return "".join(rng.choice(_LATIN) for _ in range(rng.randint(2, 8)))
+
+
+def _filler(rng, n_words, mixed):
+    out = []
+    for _ in range(n_words):
+        r = rng.random()
+        if mixed and r < 0.25:
+            out.append(_latin_word(rng))
+        elif mixed and r < 0.30:
+            out.append(str(rng.randint(0, 9999)))
+        elif mixed and r < 0.33:
+            out.append(rng.choice(_EMOJI))
+        else:
+            out.append(_ar_word(rng))
+    return " ".join(out)
+
+
+def _unique_keys(rng, n, words_per_key=(1, 3)):
+    keys = set()
+    while len(keys) < n:
+        keys.add(" ".join(_ar_word(rng) for _ in range(rng.randint(*words_per_key))))
+    return list(keys)
+
+
+def generate(directory, size, seed):
+    """يكتب ملفات الإعداد بحجم size ويعيد المفاتيح لاستخدامها في توليد الرسائل."""
+    rng = random.Random(seed)
+    words = _unique_keys(rng, size)
+    contains = _unique_keys(rng, max(1, size // 10), (1, 1))
+    forbidden = _unique_keys(rng, size, (1, 2))
+    with open(os.path.join(directory, "words.json"), "w", encoding="utf-8") as f:
+        json.dump({k: f"رد {i}" for i, k in enumerate(words)}, f, ensure_ascii=False)
+    with open(os.path.join(directory, "replies.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "exact": {},
+            "contains": {k: f"احتواء {i}" for i, k in enumerate(contains)},
+            "regex": {"^(كل عام|عيد)": "كل عام وأنتم بخير", r"\d{4}-\d{2}-\d{2}": "تاريخ"},
+            "fallback": None,
+        }, f, ensure_ascii=False)
+    with open(os.path.join(directory, "moderation.json"), "w", encoding="utf-8") as f:
+        json.dump({"forbidden": forbidden, "warning": "تحذير"}, f, ensure_ascii=False)
+    return {"exact": words, "contains": contains, "forbidden": forbidden}
+
+
+def corpus(keys, n, seed, mixed):
+    """رسائل لكل استراتيجية: exact / contains / forbidden / none (بلا تطابق متوقع)."""
+    rng = random.Random(seed + 1)
+    return {
+        "exact": [rng.choice(keys["exact"]) for _ in range(n)],
+        "contains": [f"{_filler(rng, 3, mixed)} {rng.choice(keys['contains'])} {_filler(rng, 3, mixed)}"
+                     for _ in range(n)],
+        "forbidden": [f"{_filler(rng, 4, mixed)} {rng.choice(keys['forbidden'])} {_filler(rng, 2, mixed)}"
+                      for _ in range(n)],
+        "none": [_filler(rng, rng.randint(2, 12), mixed) for _ in range(n)],
+    }
+
+
+def _stats(samples_ns):
+    samples_ns.sort()
+    n = len(samples_ns)
+    total = sum(samples_ns)
+    return {
+        "calls": n,
+        "ops_per_sec": round(n / (total / 1e9), 1) if total else None,
+        "p50_us": round(samples_ns[n // 2] / 1e3, 2),
+        "p99_us": round(samples_ns[min(n - 1, int(n * 0.99))] / 1e3, 2),
+        "max_us": round(samples_ns[-1] / 1e3, 2),
+    }
+
+
+def _measure(fn, messages):
+    clock = time.perf_counter_ns
+    out = []
+    for m in messages:
+        t0 = clock()
+        fn(m)
+        out.append(clock() - t0)
+    return _stats(out)
+
+
+def run_worker(directory, size, messages, seed, mixed):
+    """يُنفّذ داخل العملية الفرعية بعد ضبط متغيرات البيئة."""
+    sys.path.insert(0, ROOT)
+    keys = generate(directory, size, seed)
+    msgs = corpus(keys, messages, seed, mixed)
+
+    t0 = time.perf_counter()
+    import helper
+    helper._load_engine()
+    t1 = time.perf_counter()
+    helper._load_mod()
+    t2 = time.perf_counter()
+
+    # الدالة الداخلية بلا كاش LRU حتى تعكس الأرقام كلفة التطبيع الفعلية
+    from normalize import _normalize
+    normalize_uncached = lambda t: _normalize(t, True)
+
+    results = {
+        "size": size,
+        "messages_per_strategy": messages,
+        "mixed_script": mixed,
+        "build_ms": {"replies": round((t1 - t0) * 1e3, 2), "moderation": round((t2 - t1) * 1e3, 2)},
+        "functions": {},
+        "strategies": {},
+    }
+    everything = [m for group in msgs.values() for m in group]
+    random.Random(seed).shuffle(everything)
+    results["functions"]["normalize_ar"] = _measure(normalize_uncached, everything)
+    results["functions"]["check_forbidden"] = _measure(helper.check_forbidden, everything)
+    results["functions"]["get_auto_reply"] = _measure(helper.get_auto_reply, everything)
+    for name in ("exact", "contains", "none"):
+        results["strategies"][name] = _measure(helper.get_auto_reply, msgs[name])
+    results["strategies"]["forbidden"] = _measure(helper.check_forbidden, msgs["forbidden"])
+    return results
+
+
+def _print_table(all_results):
+    print(f"{'size':>8}  {'target':<26} {'ops/s':>12} {'p50 µs':>9} {'p99 µs':>9}")
+    for r in all_results:
+        print(f"{r['size']:>8}  build replies={r['build_ms']['replies']}ms moderation={r['build_ms']['moderation']}ms")
+        rows = [(f"fn:{k}", v) for k, v in r["functions"].items()]
+        rows += [(f"strategy:{k}", v) for k, v in r["strategies"].items()]
+        for name, s in rows:
+            print(f"{r['size']:>8}  {name:<26} {s['ops_per_sec']:>12} {s['p50_us']:>9} {s['p99_us']:>9}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--sizes", default="100,10000,100000")
+    p.add_argument("--messages", type=int, default=5000, help="عدد الرسائل لكل استراتيجية")
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--mixed", action="store_true", help="خلط كلمات لاتينية وأرقام وإيموجي في الرسائل")
+    p.add_argument("--with-cache", action="store_true", help="إبقاء كاش الردود مفعّلًا (معطّل افتراضيًا)")
+    p.add_argument("--json", help="حفظ النتائج بصيغة JSON في هذا المسار")
+    p.add_argument("--worker", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.worker:
+        size = int(args.sizes)
+        res = run_worker(args.worker, size, args.messages, args.seed, args.mixed)
+        print(json.dumps(res, ensure_ascii=False))
+        return
+
+    all_results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{size}-") as d:
+            env = dict(os.environ)
+            env.update({
+                "WORDS_FILE": os.path.join(d, "words.json"),
+                "REPLIES_FILE": os.path.join(d, "replies.json"),
+                "MODERATION_FILE": os.path.join(d, "moderation.json"),
+                "STORE_BACKEND": "json",
+            })
+            if not args.with_cache:
+                env["REPLY_CACHE_SIZE"] = "0"
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", d, "--sizes", str(size),
+                   "--messages", str(args.messages), "--seed", str(args.seed)]
+            if args.mixed:
+                cmd.append("--mixed")
+            out = subprocess.run(cmd, env=env, cwd=d, check=True, capture_output=True, text=True).stdout
+            all_results.append(json.loads(out.strip().splitlines()[-1]))
+
+    _print_table(all_results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": all_results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# benchmarks/loadtest.py
+# اختبار حمل من الطرف للطرف عبر /callback دون لمس LINE:
+#   1) مولّد أجسام ويبهوك موقّعة (HMAC) بمزيج من الرسائل النصية والانضمام وأحداث لا نعالجها
+#   2) خادم بديل محلي لـ Messaging API (/v2/bot/message/reply) مع تأخير وأخطاء مصطنعة
+#   3) تقرير: زمن الإقرار (ack) والزمن من الطرف للطرف وعدد النداءات الصادرة
+#
+# مثال (نافذتان):
+#   LINE_CHANNEL_SECRET=test LINE_CHANNEL_ACCESS_TOKEN=test LINE_API_HOST=http://127.0.0.1:9100 \
+#       gunicorn -w 4 main:app -b 127.0.0.1:8000
+#   python benchmarks/loadtest.py run --target http://127.0.0.1:8000/callback --secret test \
+#       --rps 200 --duration 30 --stub-port 9100 --stub-latency-ms 80 --stub-error-rate 0.02
+#
+# أو الخادم البديل وحده:  python benchmarks/loadtest.py stub --port 9100
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import random
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------- 1) توليد الأجسام الموقّعة ----------
+def sign(body: bytes, secret: str) -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+def _load_keys(name, field=None):
+    try:
+        with open(os.path.join(ROOT, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return []
+    data = data.get(field, []) if field else data
+    return list(data)
+
+
+class PayloadFactory:
+    """
+    mix: أوزان أنواع الأحداث
+      text_group / text_user: رسالة نصية (كلمة مفتاحية أو ممنوعة أو عشوائية)
+      joined: MemberJoinedEvent
+      other: ملصق (حدث لا يعالجه البوت)
+    """
+
+    def __init__(self, secret: str, mix: dict, events_per_body=(1, 3), groups: int = 50, seed: int = 7):
+        self.secret = secret
+        self.mix = mix
+        self.events_per_body = events_per_body
+        self.groups = [f"C{i:032x}" for i in range(groups)]
+        self.rng = random.Random(seed)
+        self.keywords = _load_keys("words.json") or ["مرحبا"]
+        self.forbidden = _load_keys("moderation.json", "forbidden") or ["spam"]
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def _text(self) -> str:
+        r = self.rng.random()
+        if r < 0.5:
+            return self.rng.choice(self.keywords)
+        if r < 0.6:
+            return f"هذا {self.rng.choice(self.forbidden)} هنا"
+        return " ".join(self.rng.choice("ابتثجحخدذرزسشصضطظعغفقكلمنهوي") * self.rng.randint(2, 5)
+                        for _ in range(self.rng.randint(1, 6)))
+
+    def event(self):
+        """يعيد (الحدث، reply_token أو None)."""
+        n = self._next_id()
+        kind = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        group = self.rng.choice(self.groups)
+        base = {
+            "mode": "active",
+            "timestamp": int(time.time() * 1000),
+            "webhookEventId": f"01LOAD{n:020d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"rt-{n}",
+        }
+        if kind == "text_user":
+            source = {"type": "user", "userId": f"U{n % 1000:032x}"}
+        else:
+            source = {"type": "group", "groupId": group, "userId": f"U{n % 1000:032x}"}
+        base["source"] = source
+        if kind in ("text_group", "text_user"):
+            base.update(type="message", message={"type": "text", "id": str(n), "text": self._text(), "quoteToken": "q"})
+        elif kind == "joined":
+            base.update(type="memberJoined", joined={"members": [{"type": "user", "userId": f"U{n:032x}"}]})
+        else:
+            base.update(type="message", message={"type": "sticker", "id": str(n), "packageId": "1",
+                                                 "stickerId": "1", "stickerResourceType": "STATIC",
+                                                 "quoteToken": "q"})
+        return base, base["replyToken"]
+
+    def body(self):
+        """يعيد (bytes, signature, [reply tokens])."""
+        events, tokens = [], []
+        for _ in range(self.rng.randint(*self.events_per_body)):
+            ev, token = self.event()
+            events.append(ev)
+            tokens.append(token)
+        raw = json.dumps({"destination": "Uloadtest", "events": events}, ensure_ascii=False).encode()
+        return raw, sign(raw, self.secret), tokens
+
+
+# ---------- 2) الخادم البديل لـ Messaging API ----------
+class StubState:
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, error_rate=0.0, throttle_rate=0.0, seed=11):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()          # حسب رمز الحالة
+        self.replied = {}               # reply_token -> وقت الاستلام (perf_counter)
+
+
+def make_stub_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            received = time.perf_counter()
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.rstrip("/") != "/v2/bot/message/reply":
+                return self._send(404, {"message": "not found"})
+            with state.lock:
+                delay = max(0.0, state.rng.gauss(state.latency_ms, state.jitter_ms)) / 1000.0
+                r = state.rng.random()
+            time.sleep(delay)
+            if r < state.throttle_rate:
+                status, payload, headers = 429, {"message": "rate limited"}, {"Retry-After": "1"}
+            elif r < state.throttle_rate + state.error_rate:
+                status, payload, headers = 500, {"message": "injected error"}, None
+            else:
+                status, headers = 200, None
+                payload = {"sentMessages": [{"id": "1", "quoteToken": "q"}]}
+            with state.lock:
+                state.calls[status] += 1
+                if status == 200:
+                    try:
+                        token = json.loads(raw).get("replyToken")
+                    except ValueError:
+                        token = None
+                    if token:
+                        state.replied.setdefault(token, received)
+            self._send(status, payload, headers)
+
+    return Handler
+
+
+def start_stub(port: int, state: StubState) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_stub_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="line-stub", daemon=True).start()
+    return server
+
+
+# ---------- 3) المشغّل والتقرير ----------
+def _pct(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2)
+
+
+def _summary(values):
+    return {"count": len(values), "p50_ms": _pct(values, 0.50), "p95_ms": _pct(values, 0.95),
+            "p99_ms": _pct(values, 0.99), "max_ms": _pct(values, 1.0)}
+
+
+def run(args):
+    mix = dict(item.split("=") for item in args.mix.split(","))
+    mix = {k: float(v) for k, v in mix.items()}
+    factory = PayloadFactory(args.secret, mix, (args.min_events, args.max_events), args.groups)
+    state = StubState(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate, args.stub_throttle_rate)
+    server = start_stub(args.stub_port, state) if args.stub_port else None
+
+    sent_at = {}            # reply_token -> وقت الإرسال
+    acks, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def fire(raw, signature, tokens):
+        req = urllib.request.Request(args.target, data=raw, method="POST", headers={
+            "Content-Type": "application/json", "X-Line-Signature": signature})
+        t0 = time.perf_counter()
+        with lock:
+            for t in tokens:
+                sent_at[t] = t0
+        try:
+            with urllib.request.urlopen(req, timeout=args.timeout) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = "conn-error"
+        with lock:
+            acks.append(time.perf_counter() - t0)
+            statuses[status] += 1
+
+    interval = 1.0 / args.rps
+    total = int(args.rps * args.duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(total):
+            # جدولة مفتوحة: الإرسال على مواعيد ثابتة بغض النظر عن بطء الخادم
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, *factory.body())
+    elapsed = time.perf_counter() - started
+
+    # مهلة لوصول الردود المتأخرة (الوضع غير المتزامن)
+    time.sleep(args.drain)
+    with state.lock:
+        e2e = [state.replied[t] - sent_at[t] for t in state.replied if t in sent_at]
+        calls = dict(state.calls)
+
+    report = {
+        "target": args.target,
+        "target_rps": args.rps,
+        "achieved_rps": round(total / elapsed, 1),
+        "requests": total,
+        "events": len(sent_at),
+        "ack_status": {str(k): v for k, v in statuses.items()},
+        "ack_latency": _summary(acks),
+        "end_to_end_latency": _summary(e2e),
+        "outbound_calls": {str(k): v for k, v in calls.items()},
+        "outbound_total": sum(calls.values()),
+        "replies_delivered": len(e2e),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if server:
+        server.shutdown()
+
+
+def stub(args):
+    state = StubState(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate)
+    server = start_stub(args.port, state)
+    print(f"LINE API stub على http://127.0.0.1:{args.port} (Ctrl+C للإيقاف)")
+    try:
+        while True:
+            time.sleep(5)
+            with state.lock:
+                print(json.dumps({"calls": dict(state.calls), "replied": len(state.replied)}))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="اختبار حمل لمسار /callback")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="إرسال ويبهوكات موقّعة بمعدل ثابت وطباعة التقرير")
+    r.add_argument("--target", default="http://127.0.0.1:8000/callback")
+    r.add_argument("--secret", default=os.getenv("LINE_CHANNEL_SECRET", "test"))
+    r.add_argument("--rps", type=float, default=50)
+    r.add_argument("--duration", type=float, default=10)
+    r.add_argument("--concurrency", type=int, default=64)
+    r.add_argument("--timeout", type=float, default=10)
+    r.add_argument("--mix", default="text_group=0.6,text_user=0.15,joined=0.05,other=0.2")
+    r.add_argument("--min-events", type=int, default=1)
+    r.add_argument("--max-events", type=int, default=3)
+    r.add_argument("--groups", type=int, default=50)
+    r.add_argument("--drain", type=float, default=3.0, help="ثوانٍ لانتظار الردود المتأخرة")
+    r.add_argument("--stub-port", type=int, default=9100, help="0 لعدم تشغيل الخادم البديل هنا")
+    r.add_argument("--stub-latency-ms", type=float, default=50)
+    r.add_argument("--stub-jitter-ms", type=float, default=20)
+    r.add_argument("--stub-error-rate", type=float, default=0.0)
+    r.add_argument("--stub-throttle-rate", type=float, default=0.0)
+    r.add_argument("--json", help="حفظ التقرير بصيغة JSON")
+    r.set_defaults(func=run)
+
+    s = sub.add_parser("stub", help="تشغيل الخادم البديل لـ Messaging API وحده")
+    s.add_argument("--port", type=int, default=9100)
+    s.add_argument("--latency-ms", type=float, default=50)
+    s.add_argument("--jitter-ms", type=float, default=20)
+    s.add_argument("--error-rate", type=float, default=0.0)
+    s.add_argument("--throttle-rate", type=float, default=0.0)
+    s.set_defaults(func=stub)
+
+    args = p.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# bulk.py
+# استيراد وتصدير جماعي للردود وقائمة المنع بصيغتي JSONL و CSV.
+# القراءة سطرًا سطرًا من الملف المرفوع (ذاكرة ثابتة مهما كبر)، والتحقق والتطبيع
+# على دفعات بحجم BATCH_SIZE، مع خطأ لكل سطر مرفوض بدل رفض الملف كله.
+import io
+import csv
+import json
+
+from normalize import normalize_ar
+
+BATCH_SIZE = 1000
+MAX_KEY_LEN = 300
+MAX_REPLY_LEN = 5000    # حد LINE لطول الرسالة النصية
+MAX_ERRORS = 200        # الأخطاء المحفوظة للعرض (العدد الكلي يُحسب دائمًا)
+
+KINDS = ("words", "forbidden")
+FORMATS = ("jsonl", "csv")
+# words.json / moderation.json كما يصدّرها البوت: ملف JSON واحد يُقرأ كاملًا (ليس متدفقًا)
+IMPORT_FORMATS = FORMATS + ("json",)
+
+
+class BulkImportError(ValueError):
+    """استيراد أُلغي كاملًا (ملف غير مقروء، أو أخطاء في وضع الاستبدال)؛ لا يُكتب منه شيء."""
+
+
+class ImportReport:
+    """ملخص الاستيراد: عدد الأسطر، المقبول، والأخطاء [(رقم السطر، السبب)]."""
+
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.error_count = 0
+        self.errors = []
+        self.written = 0
+        self.aborted = None
+
+    def error(self, line: int, reason: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, reason))
+
+
+def guess_format(filename: str, default: str = "jsonl") -> str:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    return default
+
+
+def _records(stream, fmt: str, kind: str):
+    """
+    (رقم السطر، السجل الخام) حيث السجل dict أو قائمة أعمدة؛ الأسطر الفارغة تُتخطى.
+    مع json يكون الرقم ترتيب المدخل في الملف.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "json":
+        data = json.load(text)
+        if kind == "forbidden" and isinstance(data, dict):
+            data = data.get("forbidden", [])
+        entries = [[k, v] for k, v in data.items()] if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise ValueError("المتوقع كائن أو قائمة")
+        yield from enumerate(entries, 1)
+        return
+    if fmt == "csv":
+        reader = csv.reader(text)
+        for row in reader:
+            if not row or not any(c.strip() for c in row):
+                continue
+            if reader.line_num == 1 and row[0].strip().lower() in ("key", "word", "term"):
+                continue   # سطر العناوين
+            yield reader.line_num, row
+        return
+    for n, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as exc:
+            yield n, exc
+
+
+def _validate(record, kind: str):
+    """يعيد (الصف، None) أو (None، السبب)."""
+    if isinstance(record, Exception):
+        return None, f"JSON غير صالح: {record}"
+    if kind == "words":
+        if isinstance(record, dict):
+            key, reply = record.get("key", record.get("word")), record.get("reply")
+        elif isinstance(record, list) and len(record) >= 2:
+            key, reply = record[0], record[1]
+        else:
+            return None, "المتوقع مفتاح ورد (key, reply)"
+        if not isinstance(key, str) or not isinstance(reply, str):
+            return None, "المفتاح والرد يجب أن يكونا نصين"
+        key, reply = key.strip(), reply.strip()
+        if not normalize_ar(key):
+            return None, "مفتاح فارغ بعد التطبيع"
+        if len(key) > MAX_KEY_LEN:
+            return None, f"المفتاح أطول من {MAX_KEY_LEN} حرفًا"
+        if not reply:
+            return None, "رد فارغ"
+        if len(reply) > MAX_REPLY_LEN:
+            return None, f"الرد أطول من {MAX_REPLY_LEN} حرفًا"
+        return (key, reply), None
+    if isinstance(record, dict):
+        term = record.get("term")
+    elif isinstance(record, list):
+        if not record:
+            return None, "المتوقع كلمة (term)"
+        term = record[0]
+    else:
+        term = record   # سطر JSONL يحوي نصًا مباشرة
+    if not isinstance(term, str):
+        return None, "الكلمة يجب أن تكون نصًا"
+    term = term.strip()
+    if not normalize_ar(term):
+        return None, "كلمة فارغة بعد التطبيع"
+    if len(term) > MAX_KEY_LEN:
+        return None, f"الكلمة أطول من {MAX_KEY_LEN} حرفًا"
+    return (term,), None
+
+
+def parse_batches(stream, fmt: str, kind: str, report: ImportReport, strict: bool = False):
+    """
+    يعيد دفعات من الصفوف الصالحة (قوائم بحجم BATCH_SIZE على الأكثر) ويسجّل أخطاء باقي الأسطر في report.
+    يرفع BulkImportError بعد آخر دفعة إن كان الملف غير مقروء، أو فيه أخطاء مع strict=True
+    (حتى يلغي الكاتب المعاملة كلها بدل استبدال القائمة بنسخة ناقصة).
+    """
+    batch = []
+    try:
+        for line, record in _records(stream, fmt, kind):
+            report.rows += 1
+            row, reason = _validate(record, kind)
+            if reason:
+                report.error(line, reason)
+                continue
+            report.accepted += 1
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+    except UnicodeDecodeError:
+        report.aborted = "الملف ليس بترميز UTF-8"
+    except csv.Error as exc:
+        report.aborted = f"CSV غير صالح: {exc}"
+    except ValueError as exc:
+        report.aborted = f"JSON غير صالح: {exc}"
+    if report.aborted is None and strict and report.error_count:
+        report.aborted = "وضع الاستبدال لا يقبل ملفًا فيه أسطر مرفوضة"
+    if report.aborted is not None:
+        raise BulkImportError(report.aborted)
+    if batch:
+        yield batch
+
+
+def format_rows(rows, fmt: str, kind: str):
+    """يحوّل صفوف التصدير إلى أسطر نصية واحدًا واحدًا (للبث دون تجميع الملف في الذاكرة)."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(("key", "reply") if kind == "words" else ("term",))
+        yield "\ufeff" + buf.getvalue()   # BOM حتى يفتح Excel الملف بالعربية
+        for row in rows:
+            buf.seek(0)
+            buf.truncate()
+            writer.writerow(row)
+            yield buf.getvalue()
+        return
+    for row in rows:
+        obj = {"key": row[0], "reply": row[1]} if kind == "words" else {"term": row[0]}
+        yield json.dumps(obj, ensure_ascii=False) + "\n"
@@ -0,0 +1,90 @@
+# dedupe.py
+# منع معالجة الحدث نفسه مرتين عند إعادة إرسال LINE للويبهوك (webhookEventId)
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class SeenEvents:
+    """
+    seen(event_id) تعيد True إن سبق رؤية المعرّف خلال ttl ثانية، وإلا تسجّله وتعيد False.
+    الذاكرة محدودة بـ max_size (الأقدم يُحذف أولًا).
+    مع path تُشارك المعرّفات بين العمّال عبر ملف SQLite محلي.
+    forget(event_id) تلغي التسجيل حين تفشل معالجة الحدث، حتى لا تُسقط إعادة الإرسال من LINE.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_size: int = 100_000, path: str = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.path = path
+        self.duplicates = 0
+        self._seen = OrderedDict()   # id -> وقت الانتهاء (بترتيب الإضافة)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+
+    def seen(self, event_id: str) -> bool:
+        if not event_id:
+            return False
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if event_id in self._seen:
+                self.duplicates += 1
+                return True
+            self._seen[event_id] = now + self.ttl
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+        if self.path and self._seen_shared(event_id, now):
+            with self._lock:
+                self.duplicates += 1
+            return True
+        return False
+
+    def forget(self, event_id: str):
+        if not event_id:
+            return
+        with self._lock:
+            self._seen.pop(event_id, None)
+        if self.path:
+            try:
+                self._conn().execute("DELETE FROM seen WHERE id=?", (event_id,))
+            except sqlite3.Error:
+                pass
+
+    def _expire(self, now: float):
+        seen = self._seen
+        while seen:
+            key, expires = next(iter(seen.items()))
+            if expires > now:
+                break
+            seen.popitem(last=False)
+
+    # ---------- المشاركة بين العمّال ----------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY, expires REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _seen_shared(self, event_id: str, now: float) -> bool:
+        try:
+            conn = self._conn()
+            inserted = conn.execute(
+                "INSERT INTO seen (id, expires) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET expires=excluded.expires WHERE seen.expires <= ?",
+                (event_id, now + self.ttl, now),
+            ).rowcount > 0
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                conn.execute("DELETE FROM seen WHERE expires <= ?", (now,))
+            return not inserted
+        except sqlite3.Error:
+            # عند تعذّر القاعدة نكتفي بالذاكرة المحلية
+            return False
@@ -0,0 +1,168 @@
+# delivery.py
+# طبقة إرسال الردود: إعادة محاولة محدودة مع تأخير متزايد عشوائي داخل عمر reply token،
+# احترام Retry-After عند 429، وقاطع دائرة (circuit breaker) يُسقط فورًا حين تكون LINE API معطّلة.
+# الفشل النهائي لا يُرفع للويبهوك (حتى لا يرد /callback بخطأ فتعيد LINE الإرسال وتتضاعف الحمولة).
+import os
+import time
+import random
+import logging
+import threading
+import email.utils
+
+try:
+    from urllib3.exceptions import HTTPError as _TransportError
+except ImportError:  # urllib3 يأتي مع line-bot-sdk عادةً
+    _TransportError = OSError
+
+log = logging.getLogger(__name__)
+
+# أخطاء الشبكة (مهلة، انقطاع اتصال ...) تُعامل كأخطاء مؤقتة
+_TRANSIENT = (OSError, _TransportError)
+
+
+class CircuitBreaker:
+    """
+    closed: الإرسال طبيعي. بعد threshold أخطاء خادم/شبكة متتالية يصبح open
+    فيُرفض كل إرسال فورًا لمدة reset_timeout ثانية، ثم half_open: محاولة واحدة
+    تعيده closed عند النجاح أو open من جديد عند الفشل؛ release() تحرّرها دون حكم
+    (خطأ محلي لا يقول شيئًا عن LINE API) فتُجرَّب محاولة أخرى.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.state, self._failures, self._trial = "closed", 0, False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state, self._failures, self._trial = "closed", 0, False
+
+    def release(self):
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    log.warning("LINE API لا تستجيب، إيقاف الإرسال مؤقتًا لمدة %.0f ثانية", self.reset_timeout)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def _status(exc):
+    status = getattr(exc, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(exc):
+    """قيمة Retry-After بالثواني (رقم أو تاريخ HTTP) من استثناء ApiException، أو None."""
+    headers = getattr(exc, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ReplyDelivery:
+    """
+    deliver(send, deadline) يستدعي send() حتى max_attempts مرة ويعيد (ok, outcome):
+      outcome = "success" | "circuit_open" | "rejected" | "throttled" | "deadline" | "exhausted"
+    - 429: انتظار Retry-After (أو التأخير المتزايد) ثم إعادة المحاولة؛ إن طلب الخادم انتظارًا أطول
+      من max_delay يُسقط الرد فورًا بدل حجز الخيط (ومعه /callback في الوضع المتزامن) كل تلك المدة.
+    - 5xx وأخطاء الشبكة: إعادة المحاولة، وتُحسب على قاطع الدائرة.
+    - 4xx الأخرى (token منتهٍ أو مستخدم، طلب غير صالح): لا فائدة من الإعادة.
+    429 و 4xx تثبت أن LINE API تستجيب، فتُحسب نجاحًا على قاطع الدائرة (وتُنهي محاولة half_open).
+    deadline وقت (time.time) لا تُبدأ بعده أي محاولة، عادةً نهاية عمر reply token.
+    on_retry(attempt, reason) يُستدعى قبل كل إعادة (للعدّادات).
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.25, max_delay: float = 4.0,
+                 breaker: CircuitBreaker = None, on_retry=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.on_retry = on_retry
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter: عشوائي بين 0 والحد الأعلى حتى لا تتزامن إعادة المحاولات بين العمّال
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def deliver(self, send, deadline: float):
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                return False, "circuit_open"
+            try:
+                send()
+            except _TRANSIENT as exc:
+                self.breaker.failure()
+                reason, wait = "network", self._backoff(attempt)
+                log.warning("خطأ شبكة أثناء الرد (محاولة %d): %s", attempt + 1, exc)
+            except Exception as exc:
+                status = _status(exc)
+                if status is not None and status < 500:
+                    self.breaker.success()
+                if status == 429:
+                    reason = "429"
+                    wait = retry_after(exc)
+                    if wait is None:
+                        wait = self._backoff(attempt)
+                    elif wait > self.max_delay:
+                        return False, "throttled"
+                elif status is not None and status >= 500:
+                    self.breaker.failure()
+                    reason, wait = "5xx", self._backoff(attempt)
+                elif status is not None:
+                    log.warning("رفضت LINE API الرد (%s): %s", status, getattr(exc, "body", exc))
+                    return False, "rejected"
+                else:
+                    self.breaker.release()
+                    raise
+            else:
+                self.breaker.success()
+                return True, "success"
+
+            if self.breaker.state == "open":
+                return False, "circuit_open"
+            if attempt + 1 >= self.max_attempts:
+                return False, "exhausted"
+            if time.time() + wait >= deadline:
+                return False, "deadline"
+            if self.on_retry:
+                self.on_retry(attempt + 1, reason)
+            time.sleep(wait)
+        return False, "exhausted"
@@ -0,0 +1,115 @@
+# domains.py
+# استخراج الروابط من الرسائل (تعبير واحد مُجمّع) وقائمة حظر/سماح للنطاقات
+# مفهرسة كشجرة لاحقات بالمقاطع المعكوسة (com -> example -> spam)،
+# فيكون البحث بعدد مقاطع النطاق لا بحجم القائمة.
+import re
+
+from matcher import Match
+
+# الروابط تُلتقط بمرور خطي: كل سلسلة متصلة من أحرف أسماء النطاقات ([\w.-]) مرشّحة، وكل ما عداها
+# (مسافات، ://، @، /، ?) فاصل، فلا يُجرّب تعبير متداخل من كل موضع في رسالة طويلة بلا مسافات.
+# \w تشمل الحروف غير اللاتينية حتى تُلتقط النطاقات الدولية (IDN).
+_RUN = re.compile(r"[\w.-]+")
+_LABEL = re.compile(r"[^\W_](?:[\w-]{0,61}[^\W_])?")
+_TLD = re.compile(r"[^\W\d_]{2,63}|xn--[a-z0-9-]{2,59}", re.IGNORECASE)
+_MAX_HOST = 253
+
+_SELF = "\0self"   # القاعدة تنطبق على النطاق نفسه
+_SUB = "\0sub"     # القاعدة تنطبق على النطاقات الفرعية
+
+
+def normalize_host(host: str) -> str:
+    """أحرف صغيرة، بلا نقطة أخيرة، والنطاقات الدولية بصيغة punycode."""
+    host = host.strip().strip(".").lower()
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    return host
+
+
+def _host_suffix(run: str):
+    """أطول لاحقة صالحة كاسم نطاق من السلسلة (مقاطع صالحة، امتداد حرفي، حتى 253 حرفًا)، أو None."""
+    labels = run.split(".")
+    if labels and not labels[-1]:
+        labels.pop()   # نقطة في آخر الجملة
+    if len(labels) < 2 or not _TLD.fullmatch(labels[-1]):
+        return None
+    size, keep = len(labels[-1]), 1
+    for label in reversed(labels[:-1]):
+        if not _LABEL.fullmatch(label) or size + 1 + len(label) > _MAX_HOST:
+            break
+        size += 1 + len(label)
+        keep += 1
+    return ".".join(labels[-keep:]) if keep >= 2 else None
+
+
+def iter_hosts(text: str):
+    """يعيد (النطاق بعد التطبيع، start، end) لكل رابط في النص."""
+    for m in _RUN.finditer(text or ""):
+        host = _host_suffix(m.group())
+        if host:
+            end = m.end() - m.group().endswith(".")
+            yield normalize_host(host), end - len(host), end
+
+
+class DomainTrie:
+    """
+    add("spam.example")    : يحظر النطاق ونطاقاته الفرعية.
+    add("*.spam.example")  : النطاقات الفرعية فقط.
+    add(..., "allow")      : قاعدة سماح.
+    lookup(host) يعيد (verdict, rule) لأكثر قاعدة تحديدًا تنطبق على النطاق، أو None؛
+    عند تساوي التحديد يتقدّم السماح على الحظر.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def add(self, rule: str, verdict: str = "block"):
+        if not isinstance(rule, str):
+            return
+        wildcard = rule.strip().startswith(("*.", "."))
+        host = normalize_host(rule.strip().lstrip("*"))
+        if not host:
+            return
+        node = self._root
+        for label in reversed(host.split(".")):
+            node = node.setdefault(label, {})
+        entry = (verdict, rule.strip())
+        for slot in ((_SUB,) if wildcard else (_SELF, _SUB)):
+            current = node.get(slot)
+            if current is None:
+                self._size += slot == _SUB
+                node[slot] = entry
+            elif verdict == "allow":
+                node[slot] = entry
+
+    def lookup(self, host: str):
+        labels = normalize_host(host).split(".")
+        node, best = self._root, None
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                break
+            found = node.get(_SELF if i == 0 else _SUB)
+            if found is not None:
+                best = found
+        return best
+
+    def find(self, text: str):
+        """أول رابط محظور في النص كـ Match(term=القاعدة، start، end، value=النطاق)، أو None."""
+        if not self._size:
+            return None
+        for host, start, end in iter_hosts(text):
+            found = self.lookup(host)
+            if found is not None and found[0] == "block":
+                return Match(found[1], start, end, host)
+        return None
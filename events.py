@@ -0,0 +1,87 @@
+# events.py
+# مسار سريع للويبهوك: تحقق من التوقيع على البايتات الخام، تحليل JSON سريع،
+# وتمثيل خفيف للأحداث التي نعالجها فقط (رسالة نصية، انضمام عضو).
+# الأسماء تطابق نماذج linebot v3 (reply_token, source.group_id, message.text ...)
+# حتى تعمل plan_text / plan_member_joined على أيٍّ منهما دون تعديل.
+import hmac
+import base64
+import hashlib
+
+try:  # اختياري: أسرع بكثير من json إن كان مثبتًا
+    import orjson as _json
+    _loads = _json.loads
+except ImportError:
+    import json as _json
+    _loads = _json.loads
+
+
+class LiteSource:
+    __slots__ = ("type", "user_id", "group_id", "room_id")
+
+    def __init__(self, d: dict):
+        self.type = d.get("type")
+        self.user_id = d.get("userId")
+        self.group_id = d.get("groupId")
+        self.room_id = d.get("roomId")
+
+
+class LiteMessage:
+    __slots__ = ("type", "id", "text")
+
+    def __init__(self, d: dict):
+        self.type = d.get("type")
+        self.id = d.get("id")
+        self.text = d.get("text")
+
+
+class LiteDeliveryContext:
+    __slots__ = ("is_redelivery",)
+
+    def __init__(self, d: dict):
+        self.is_redelivery = bool(d.get("isRedelivery"))
+
+
+class LiteEvent:
+    __slots__ = ("type", "mode", "timestamp", "reply_token", "webhook_event_id",
+                 "delivery_context", "source", "message")
+
+    def __init__(self, d: dict):
+        self.type = d.get("type")
+        self.mode = d.get("mode")
+        self.timestamp = d.get("timestamp")
+        self.reply_token = d.get("replyToken")
+        self.webhook_event_id = d.get("webhookEventId")
+        self.delivery_context = LiteDeliveryContext(d.get("deliveryContext") or {})
+        self.source = LiteSource(d.get("source") or {})
+        msg = d.get("message")
+        self.message = LiteMessage(msg) if msg else None
+
+
+def verify_signature(secret: bytes, raw: bytes, signature: str) -> bool:
+    """HMAC-SHA256 على البايتات كما وصلت (دون فك الترميز)."""
+    if not signature:
+        return False
+    digest = hmac.new(secret, raw, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest), signature.encode("utf-8"))
+
+
+def is_relevant(d: dict) -> bool:
+    t = d.get("type")
+    if t == "message":
+        return (d.get("message") or {}).get("type") == "text"
+    return t == "memberJoined"
+
+
+def parse_events(raw: bytes):
+    """
+    يعيد (الأحداث المهمة كـ LiteEvent، أنواع كل الأحداث).
+    باقي الأحداث (ملصقات، صور، متابعة، postback ...) تُتخطى دون إنشاء أي كائن.
+    """
+    payload = _loads(raw)
+    events, types = [], []
+    for d in payload.get("events") or ():
+        t = d.get("type") or "unknown"
+        types.append(t)
+        if is_relevant(d):
+            events.append(LiteEvent(d))
+    return events, types
@@ -0,0 +1,50 @@
+# flood.py
+# رصد تكرار الرسالة نفسها من المستخدم نفسه داخل القروب (لصق إعلان عدة مرات)
+# بعدّاد نافذة منزلقة لكل (قروب، مستخدم، بصمة النص) مع ذاكرة محدودة.
+import time
+import threading
+from collections import OrderedDict
+
+
+class RepeatDetector:
+    """
+    hit(scope, fingerprint) تسجّل الرسالة وتعيد العدد التقريبي لتكرارها خلال آخر window ثانية.
+    النافذة المنزلقة تقريبية بعدّادين (النافذة الحالية + السابقة موزونة بما تبقّى منها)،
+    فالتحديث O(1) والحالة ثلاثة أرقام لكل مفتاح. المفاتيح الأقدم استخدامًا تُحذف أولًا عند تجاوز max_keys.
+    """
+
+    def __init__(self, window: float = 60.0, max_keys: int = 50_000):
+        self._lock = threading.Lock()
+        self._counters = OrderedDict()   # (scope, fingerprint) -> [بداية النافذة، الحالي، السابق]
+        self.configure(window, max_keys)
+
+    def configure(self, window: float, max_keys: int = 50_000):
+        with self._lock:
+            self.window = max(1.0, float(window))
+            self.max_keys = max(1, int(max_keys))
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+    def __len__(self):
+        return len(self._counters)
+
+    def hit(self, scope, fingerprint) -> float:
+        now = time.monotonic()
+        key = (scope, fingerprint)
+        with self._lock:
+            c = self._counters.get(key)
+            if c is None:
+                c = self._counters[key] = [now, 0, 0]
+                while len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+            elapsed = now - c[0]
+            if elapsed >= self.window:
+                # نافذة واحدة مضت: الحالي يصبح السابق؛ أكثر من ذلك: لا شيء يبقى
+                c[2] = c[1] if elapsed < 2 * self.window else 0
+                c[1] = 0
+                c[0] += self.window * int(elapsed // self.window)
+                elapsed = now - c[0]
+            c[1] += 1
+            return c[1] + c[2] * (1.0 - elapsed / self.window)
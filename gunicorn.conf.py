@@ -0,0 +1,9 @@
+# gunicorn.conf.py
+# يُقرأ تلقائيًا عند تشغيل "gunicorn main:app" من مجلد المشروع.
+# محركات المطابقة تُبنى (أو تُحمّل من اللقطة) مرة واحدة في العملية الأم،
+# والعمّال يرثونها عبر fork بدل أن يبنيها كل عامل عند أول رسالة.
+
+
+def on_starting(server):
+    import helper
+    helper.preload()
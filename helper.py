@@ -1,17 +1,19 @@
 # helper.py
-import os, json, re, datetime
-
-# ---------- تطبيع النص العربي ----------
-_ARABIC_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
-def normalize_ar(text: str) -> str:
-    if not text:
-        return ""
-    t = text.strip()
-    t = _ARABIC_DIACRITICS.sub("", t)     # إزالة التشكيل
-    t = t.replace("ـ", "")                # إزالة التطويل
-    t = t.replace("أ","ا").replace("إ","ا").replace("آ","ا")
-    t = t.replace("ى","ي").replace("ئ","ي").replace("ؤ","و")
-    return t.lower()
+import os, gc, json, time, datetime, threading
+
+from analytics import HitCounter
+from cache import LRUCache
+from domains import DomainTrie
+from flood import RepeatDetector
+from matcher import AhoCorasick, Match
+from metrics import registry
+from normalize import normalize_ar, translate_ar  # قواعد التطبيع مشتركة مع app.py
+from ratelimit import TokenBucketLimiter
+from reloader import FileWatcher
+from search import KeyIndex
+from snapshot import SnapshotStore, file_key
+from store import store_from_env
+from replies import ReplyEngine, OverlayEngine, Reply
 
 # ---------- مسارات الملفات (مُوحّدة) ----------
 # نُفضّل قراءة المسار من WORDS_FILE (لو عندك /data/words.json على Render)
@@ -21,6 +23,20 @@ _WORDS_PATH = (
     or "words.json"
 )
 
+# الردود المنظّمة (exact / contains / regex / fallback)
+_REPLIES_PATH = (
+    os.getenv("REPLIES_FILE")
+    or os.getenv("REPLIES_PATH")
+    or "replies.json"
+)
+
+# قواعد خاصة لكل قروب/غرفة فوق القواعد العامة (groupId/roomId -> قواعد)
+_GROUPS_PATH = (
+    os.getenv("GROUPS_FILE")
+    or os.getenv("GROUPS_PATH")
+    or "groups.json"
+)
+
 # لقائمة المنع
 _MOD_PATH = (
     os.getenv("MODERATION_FILE")
@@ -28,12 +44,92 @@ _MOD_PATH = (
     or "moderation.json"
 )
 
-# ---------- كاش خفيف بوقت التعديل ----------
+# قائمة نطاقات محظورة كبيرة (سطر لكل نطاق، # للتعليقات) إضافةً إلى blocked_domains في moderation.json
+_BLOCKLIST_PATH = (
+    os.getenv("BLOCKLIST_FILE")
+    or os.getenv("BLOCKLIST_PATH")
+    or "blocklist.txt"
+)
+
+# ---------- كاش مع مراقب ملفات في الخلفية ----------
+# لا stat مع كل رسالة: المراقب (inotify أو فحص دوري) يرفع رقم إصدار كل ملف،
+# والرسالة تقارن الأرقام فقط. CONFIG_WATCH=auto|poll و CONFIG_POLL_INTERVAL بالثواني.
+_watcher = FileWatcher(
+    mode=os.getenv("CONFIG_WATCH", "auto"),
+    poll_interval=float(os.getenv("CONFIG_POLL_INTERVAL", "2")),
+)
+
 _WORDS = None
-_W_MTIME = None
+_WORD_KEYS = None       # المفتاح المُطبّع -> {المفتاح الأصلي: الرد} (للتعديلات الحيّة)
+_REPLIES = None
+
+_ENGINE = None
+_E_STAMP = None
+_E_CURRENT = None       # (stamp, ReplyEngine) يُنشر دفعة واحدة: القارئ يأخذ المحرك وختمه معًا
+_ENGINE_LOCK = threading.Lock()
+_E_INPUTS = None        # (exact, contains, regex, fallback) لبناء نسخة contains_all عند الطلب
+_ENGINE_ALL = None      # (stamp, ReplyEngine) حيث كل مفاتيح words.json تُطابق بالاحتواء (app.py)
 
 _MOD = None
-_M_MTIME = None
+_M_STAMP = None
+_MOD_LOCK = threading.Lock()
+
+# القواعد الخام لكل القروبات (صغيرة)، والمُجمّع منها في LRU يُبنى عند أول رسالة من القروب
+#   GROUP_CACHE_SIZE=256
+_GROUPS = None
+_G_STAMP = None
+_GROUPS_LOCK = threading.Lock()
+_GROUP_CACHE = LRUCache(int(os.getenv("GROUP_CACHE_SIZE", "256")))
+
+# لقطة مُجمّعة على القرص (replies.snapshot / moderation.snapshot) بجانب ملف الكلمات:
+# العامل الجديد يحمّلها بدل إعادة البناء إن لم تتغيّر المصادر. SNAPSHOT_DIR لمجلد آخر، MATCHER_SNAPSHOT=0 للتعطيل
+_SNAPSHOTS = SnapshotStore(
+    None if os.getenv("MATCHER_SNAPSHOT", "1") == "0"
+    else os.getenv("SNAPSHOT_DIR") or os.path.dirname(os.path.abspath(_WORDS_PATH))
+)
+
+# عدّادات استخدام المفاتيح وكلمات المنع: في الذاكرة، وتُفرَّغ إلى SQLite كل ANALYTICS_FLUSH_INTERVAL ثانية
+#   ANALYTICS_FILE (افتراضيًا analytics.db بجانب ملف الكلمات، وفارغ = الذاكرة فقط)
+_HITS = HitCounter(
+    path=os.getenv("ANALYTICS_FILE", os.path.join(os.path.dirname(os.path.abspath(_WORDS_PATH)), "analytics.db")) or None,
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "30")),
+)
+
+_DEFAULT_WARNING = "⚠️ الرجاء عدم استخدام الكلمات المخالفة."
+
+# مخزن SQLite اختياري (STORE_BACKEND=sqlite)؛ يُفتح عند أول استخدام
+_STORE = None
+_STORE_READY = False
+_STORE_LOCK = threading.Lock()
+
+# كاش قرارات الرد (بما فيها "لا رد") بمفتاح (النص المُطبّع، إصدار الملفات)
+#   REPLY_CACHE_SIZE=4096 (0 للتعطيل)
+_REPLY_CACHE = LRUCache(int(os.getenv("REPLY_CACHE_SIZE", "4096")))
+_NO_REPLY = ("no-reply",)
+
+# حدود الإرسال لكل قروب/غرفة/مستخدم (قسم rate_limit في moderation.json)
+_RATE_DEFAULTS = {
+    "warnings_per_minute": 3, "warnings_burst": 2,
+    "replies_per_minute": 30, "replies_burst": 10,
+    "max_sources": 10000,
+}
+_WARN_LIMITER = TokenBucketLimiter(_RATE_DEFAULTS["warnings_per_minute"], _RATE_DEFAULTS["warnings_burst"])
+_REPLY_LIMITER = TokenBucketLimiter(_RATE_DEFAULTS["replies_per_minute"], _RATE_DEFAULTS["replies_burst"])
+
+# تكرار الرسالة نفسها من المستخدم نفسه في القروب (قسم flood في moderation.json)
+_FLOOD_DEFAULTS = {"window_seconds": 60, "max_repeats": 3, "min_length": 6, "max_keys": 50000, "warning": None}
+_REPEATS = RepeatDetector(_FLOOD_DEFAULTS["window_seconds"], _FLOOD_DEFAULTS["max_keys"])
+
+# أوامر تعتمد على الوقت: لا تُخزّن نتائجها أبدًا
+_TIME_COMMANDS = ("!time", "!date")
+
+# مع SQLite تُطبّق تعديلات لوحة الإدارة كفروقات على المحركات الحيّة (سجل changes)؛
+# إن زاد عدد التغييرات المتراكمة عن هذا الحد فإعادة البناء الكاملة أرخص
+_DELTA_MAX = int(os.getenv("DELTA_MAX_CHANGES", "1000"))
+
+# مفاتيح words.json القصيرة الشائعة التي تُطابق بالاحتواء (سلوك قديم)؛
+# مُطبّعة مثل المفاتيح التي تُقارن بها ("مساعدة" -> "مساعده")
+_LEGACY_CONTAINS = frozenset(map(normalize_ar, ("بوت", "مساعدة", "شكرا", "شكراً", "صباح", "مساء", "السلام")))
 
 def _safe_load_json(path):
     try:
@@ -42,98 +138,677 @@ def _safe_load_json(path):
     except Exception:
         return None
 
-# ----- تحميل الكلمات مع فحص mtime في كل نداء -----
-def _load_words():
-    global _WORDS, _W_MTIME
-    try:
-        mtime = os.path.getmtime(_WORDS_PATH)
-    except Exception:
-        # لو الملف غير موجود أو لا يمكن قراءته
-        _WORDS, _W_MTIME = {}, None
-        return
+def notify_changed(path: str):
+    """يُستدعى بعد كتابة ملف من داخل نفس العملية (لوحة الإدارة) ليظهر التغيير فورًا."""
+    _watcher.notify(path)
 
-    if _WORDS is not None and _W_MTIME == mtime:
-        # لا تغيير على الملف
-        return
+def get_store():
+    """KeywordStore عند تفعيل SQLite، وإلا None (ملفات JSON)."""
+    global _STORE, _STORE_READY
+    if not _STORE_READY:
+        with _STORE_LOCK:
+            if not _STORE_READY:
+                # الاستيراد الأولي من الملف الدائم إن وُجد، وإلا من نسخة الريبو
+                seed = _WORDS_PATH if os.path.exists(_WORDS_PATH) else "words.json"
+                _STORE = store_from_env(seed, _MOD_PATH)
+                _STORE_READY = True
+    return _STORE
+
+def _words_version():
+    store = get_store()
+    return ("db", store.revision("words")) if store else _watcher.version(_WORDS_PATH)
 
-    data = _safe_load_json(_WORDS_PATH) or {}
-    # طَبّع المفاتيح العربية
-    normalized = {}
-    for k, v in data.items():
+def _read_words() -> dict:
+    """{المفتاح المُطبّع: {المفتاح الأصلي: الرد}} بترتيب المصدر؛ آخر مفتاح أصلي هو الفعّال."""
+    store = get_store()
+    data = store.words() if store else _safe_load_json(_WORDS_PATH)
+    # طَبّع المفاتيح العربية مع الاحتفاظ بالأصلية: عدة مفاتيح (مَرحبا / مرحبا) قد تتطابق بعد التطبيع
+    groups = {}
+    for k, v in (data if isinstance(data, dict) else {}).items():
         if not isinstance(k, str):
             continue
-        normalized[normalize_ar(k)] = v
-    _WORDS = normalized
-    _W_MTIME = mtime
+        groups.setdefault(normalize_ar(k), {})[k] = v
+    return groups
 
-# ----- تحميل المنع مع فحص mtime في كل نداء -----
-def _load_mod():
-    global _MOD, _M_MTIME
+def _effective(groups: dict) -> dict:
+    return {k: next(reversed(g.values())) for k, g in groups.items()}
+
+def _read_replies() -> dict:
+    data = _safe_load_json(_REPLIES_PATH)
+    return data if isinstance(data, dict) else {}
+
+def _norm_section(section) -> dict:
+    out = {}
+    if isinstance(section, dict):
+        for k, v in section.items():
+            if isinstance(k, str) and v:
+                out.setdefault(normalize_ar(k), v)
+    return out
+
+# ----- بناء محرك الردود عند تغيّر words.json أو replies.json -----
+def _load_engine():
+    global _WORDS, _WORD_KEYS, _REPLIES, _ENGINE, _E_STAMP, _E_INPUTS, _E_CURRENT
+    stamp = (_words_version(), _watcher.version(_REPLIES_PATH))
+    if _ENGINE is not None and _E_STAMP == stamp:
+        return
+
+    # خيط واحد فقط يعيد البناء؛ البقية تكمل باللقطة الحالية إن وُجدت
+    if not _ENGINE_LOCK.acquire(blocking=_ENGINE is None):
+        return
     try:
-        mtime = os.path.getmtime(_MOD_PATH)
-    except Exception:
-        _MOD, _M_MTIME = {"forbidden": [], "warning": "⚠️ الرجاء عدم استخدام الكلمات المخالفة.", "notify_admin": False}, None
+        if _ENGINE is not None and _E_STAMP == stamp:
+            return
+        t0 = time.perf_counter()
+        if _ENGINE is not None and _apply_word_changes(stamp):
+            registry.observe("linebot_stage_seconds", time.perf_counter() - t0, stage="reload_delta")
+            registry.inc("linebot_reloads_total", kind="replies_delta")
+            return
+        # أول بناء في العملية: من اللقطة على القرص إن كانت المصادر لم تتغيّر
+        cold = _ENGINE is None
+        key = _engine_source_key() if cold else None
+        built = _SNAPSHOTS.load("replies", key) if cold else None
+        if built is None:
+            built = _build_engine()
+            if cold:
+                _SNAPSHOTS.save("replies", key, built)
+        else:
+            registry.inc("linebot_reloads_total", kind="replies_snapshot")
+
+        # تبديل اللقطة دفعة واحدة بعد اكتمال البناء
+        _WORD_KEYS, _REPLIES, _E_INPUTS, _ENGINE = built
+        _WORDS = _effective(_WORD_KEYS)
+        _E_STAMP = stamp
+        _E_CURRENT = (stamp, _ENGINE)
+        registry.observe("linebot_stage_seconds", time.perf_counter() - t0, stage="reload")
+        registry.inc("linebot_reloads_total", kind="replies")
+    finally:
+        _ENGINE_LOCK.release()
+
+def _apply_word_changes(stamp) -> bool:
+    """
+    يطبّق تغييرات الكلمات من سجل القاعدة على المحرك الحي مفتاحًا مفتاحًا.
+    يعيد False (فيلزم بناء كامل) إن تغيّر replies.json أو لم تكن القاعدة مفعّلة أو نقص السجل.
+    """
+    global _E_STAMP, _E_CURRENT, _ENGINE_ALL
+    store, old = get_store(), _E_STAMP
+    if store is None or old is None or old[1] != stamp[1] or old[0][0] != "db" or stamp[0][0] != "db":
+        return False
+    changes = store.changes_since("words", old[0][1])
+    if changes is None or len(changes) > _DELTA_MAX:
+        return False
+    rep_exact = _norm_section(_REPLIES.get("exact"))
+    rep_contains = _norm_section(_REPLIES.get("contains"))
+    exact, contains, _, _ = _E_INPUTS
+    current_all = _ENGINE_ALL
+    engine_all = current_all[1] if current_all is not None and current_all[0] == old else None
+    for rev, op, key, value in changes:
+        if rev > stamp[0][1]:
+            break   # كُتب بعد قراءة المراجعة؛ يُطبّق في الدورة التالية
+        # يُعاد حل المفتاح المُطبّع من كل المفاتيح الأصلية المقابلة له، كما يفعل البناء الكامل،
+        # فحذف "مَرحبا" لا يُسقط "مرحبا" الموجود في القاعدة
+        k = normalize_ar(key)
+        group = _WORD_KEYS.setdefault(k, {})
+        if op == "upsert":
+            group[key] = value
+        else:
+            group.pop(key, None)
+        if group:
+            _WORDS[k] = next(reversed(group.values()))
+        else:
+            del _WORD_KEYS[k]
+            _WORDS.pop(k, None)
+        # القيمة الصحيحة الآن بنفس قواعد _build_engine (words تتقدّم على replies.json)
+        e = _WORDS.get(k, rep_exact.get(k))
+        c = _WORDS[k] if k in _LEGACY_CONTAINS and k in _WORDS else rep_contains.get(k)
+        for d, v in ((exact, e), (contains, c)):
+            if v is None:
+                d.pop(k, None)
+            else:
+                d[k] = v
+        _ENGINE.update("exact", k, e)
+        _ENGINE.update("contains", k, c)
+        if engine_all is not None:
+            engine_all.update("exact", k, e)
+            engine_all.update("contains", k, _WORDS.get(k, c))
+    _E_STAMP = stamp
+    _E_CURRENT = (stamp, _ENGINE)
+    if engine_all is not None:
+        _ENGINE_ALL = (stamp, engine_all)
+    return True
+
+def _engine_source_key():
+    store = get_store()
+    words = ("db", store.path, store.revision("words")) if store else file_key(_WORDS_PATH)
+    return (words, file_key(_REPLIES_PATH))
+
+def _build_engine():
+    """يعيد (words, replies, inputs, ReplyEngine) من الملفات/القاعدة؛ words = مجموعات _read_words."""
+    groups = _read_words()
+    words = _effective(groups)
+    rep = _read_replies()
+    # words.json (المعدّل من لوحة الإدارة) يتقدّم على replies.json
+    exact = _norm_section(rep.get("exact"))
+    exact.update(words)
+    contains = {k: v for k, v in words.items() if k in _LEGACY_CONTAINS}
+    for k, v in _norm_section(rep.get("contains")).items():
+        contains.setdefault(k, v)
+    # الأنماط تُطبّق على النص المُطبّع، فتُوحّد حروفها بنفس الجدول
+    regex = {translate_ar(k): v for k, v in (rep.get("regex") or {}).items() if isinstance(k, str) and v}
+    fallback = rep.get("fallback") or None
+    return groups, rep, (exact, contains, regex, fallback), ReplyEngine(exact, contains, regex, fallback)
+
+def _engine_all():
+    """(stamp, محرك) حيث كل مفتاح في words.json مطابقة احتواء (سلوك app.py)؛ يُبنى عند أول طلب."""
+    global _ENGINE_ALL
+    _load_engine()
+    current = _ENGINE_ALL
+    if current is not None and current[0] == _E_STAMP:
+        return current
+    with _ENGINE_LOCK:
+        stamp, (exact, contains, regex, fallback), words = _E_STAMP, _E_INPUTS, _WORDS
+        if _ENGINE_ALL is None or _ENGINE_ALL[0] != stamp:
+            merged = dict(words)
+            for k, v in contains.items():
+                merged.setdefault(k, v)
+            _ENGINE_ALL = (stamp, ReplyEngine(exact, merged, regex, fallback))
+        return _ENGINE_ALL
+
+# ----- تحميل المنع عند تغيّر moderation.json -----
+def _load_mod():
+    global _MOD, _M_STAMP
+    store = get_store()
+    stamp = (_watcher.version(_MOD_PATH), store.revision("forbidden") if store else None,
+             _watcher.version(_BLOCKLIST_PATH))
+    if _MOD is not None and _M_STAMP == stamp:
         return
 
-    if _MOD is not None and _M_MTIME == mtime:
+    if not _MOD_LOCK.acquire(blocking=_MOD is None):
         return
+    try:
+        if _MOD is not None and _M_STAMP == stamp:
+            return
+        t0 = time.perf_counter()
+        if _MOD is not None and _apply_forbidden_changes(store, stamp):
+            registry.observe("linebot_stage_seconds", time.perf_counter() - t0, stage="reload_delta")
+            registry.inc("linebot_reloads_total", kind="moderation_delta")
+            return
+        cold = _MOD is None
+        key = (file_key(_MOD_PATH), (store.path, stamp[1]) if store else None,
+               file_key(_BLOCKLIST_PATH)) if cold else None
+        built = _SNAPSHOTS.load("moderation", key) if cold else None
+        if built is None:
+            built = _build_mod(store)
+            if cold:
+                _SNAPSHOTS.save("moderation", key, built)
+        else:
+            registry.inc("linebot_reloads_total", kind="moderation_snapshot")
+        mod, rate_limit = built
+        _configure_limits(rate_limit)
+        _REPEATS.configure(mod["flood"]["window_seconds"], mod["flood"]["max_keys"])
+        _MOD = mod
+        _M_STAMP = stamp
+        registry.observe("linebot_stage_seconds", time.perf_counter() - t0, stage="reload")
+        registry.inc("linebot_reloads_total", kind="moderation")
+    finally:
+        _MOD_LOCK.release()
 
-    data = _safe_load_json(_MOD_PATH) or {}
-    forb = []
-    for x in data.get("forbidden", []):
+def _apply_forbidden_changes(store, stamp) -> bool:
+    """مثل _apply_word_changes لقائمة المنع: إدراج/حذف نمط واحد في الآلة الحيّة."""
+    global _M_STAMP
+    old = _M_STAMP
+    if store is None or old is None or old[0] != stamp[0] or old[2] != stamp[2]:
+        return False
+    changes = store.changes_since("forbidden", old[1])
+    if changes is None or len(changes) > _DELTA_MAX:
+        return False
+    forb, automaton = _MOD["forbidden"], _MOD["automaton"]
+    for rev, op, term, _ in changes:
+        if rev > stamp[1]:
+            break
+        # النمط المُطبّع يبقى ما دامت له كلمة أصلية واحدة على الأقل (شَتيمة / شتيمة)
+        n = normalize_ar(term)
+        raws = forb.setdefault(n, [])
+        if op == "upsert":
+            if term not in raws:
+                raws.append(term)
+        elif term in raws:
+            raws.remove(term)
+        if raws:
+            automaton.insert(n, raws[0])
+        else:
+            del forb[n]
+            automaton.remove(n)
+    _M_STAMP = stamp
+    return True
+
+def _build_mod(store):
+    """يعيد (_MOD، قسم rate_limit) من moderation.json أو القاعدة."""
+    data = _safe_load_json(_MOD_PATH)
+    data = data if isinstance(data, dict) else {}
+    forb = {}   # النمط المُطبّع -> الكلمات الأصلية المقابلة له
+    automaton = AhoCorasick()
+    # مع SQLite تكون قائمة المنع في القاعدة، وباقي الإعدادات في moderation.json
+    for x in (store.forbidden() if store else data.get("forbidden", [])):
         if isinstance(x, str):
-            forb.append(normalize_ar(x))
-    _MOD = {
+            n = normalize_ar(x)
+            forb.setdefault(n, []).append(x)
+            automaton.add(n, x)  # القيمة = أول كلمة أصلية كما في الملف
+    automaton.build()  # تُبنى الآلة مرة واحدة عند إعادة التحميل فقط
+    mod = {
         "forbidden": forb,
-        "warning": data.get("warning") or "⚠️ الرجاء عدم استخدام الكلمات المخالفة.",
+        "automaton": automaton,
+        "domains": _build_domains(data),
+        "flood": _flood_config(data.get("flood")),
+        "warning": data.get("warning") or _DEFAULT_WARNING,
         "notify_admin": bool(data.get("notify_admin", False))
     }
-    _M_MTIME = mtime
+    return mod, data.get("rate_limit")
+
+def _build_domains(data: dict) -> DomainTrie:
+    domains = DomainTrie()
+    for rule in data.get("allowed_domains") or []:
+        domains.add(rule, "allow")
+    for rule in data.get("blocked_domains") or []:
+        domains.add(rule, "block")
+    try:
+        with open(_BLOCKLIST_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    domains.add(line, "block")
+    except OSError:
+        pass
+    return domains
+
+def _flood_config(section) -> dict:
+    cfg = dict(_FLOOD_DEFAULTS)
+    if isinstance(section, dict):
+        for k in cfg:
+            if isinstance(section.get(k), (int, float)) or (k == "warning" and isinstance(section.get(k), str)):
+                cfg[k] = section[k]
+    return cfg
+
+def _configure_limits(section):
+    cfg = dict(_RATE_DEFAULTS)
+    if isinstance(section, dict):
+        for k in cfg:
+            if isinstance(section.get(k), (int, float)):
+                cfg[k] = section[k]
+    _WARN_LIMITER.configure(cfg["warnings_per_minute"], cfg["warnings_burst"], cfg["max_sources"])
+    _REPLY_LIMITER.configure(cfg["replies_per_minute"], cfg["replies_burst"], cfg["max_sources"])
+
+# ----- تعديل قائمة المنع من لوحة الإدارة -----
+def forbidden_terms() -> list:
+    store = get_store()
+    if store is not None:
+        return store.forbidden()
+    data = _safe_load_json(_MOD_PATH)
+    return [t for t in (data.get("forbidden") or []) if isinstance(t, str)] if isinstance(data, dict) else []
+
+def add_forbidden_term(term: str) -> bool:
+    """مع SQLite: صف واحد + فرق يُطبّق على الآلة الحيّة؛ مع JSON: إعادة كتابة moderation.json."""
+    store = get_store()
+    if store is not None:
+        changed = store.add_forbidden(term)
+        _load_mod()
+        return changed
+    return _edit_moderation_file(lambda terms: terms + [term] if term not in terms else None)
+
+def remove_forbidden_term(term: str) -> bool:
+    store = get_store()
+    if store is not None:
+        changed = store.remove_forbidden(term)
+        _load_mod()
+        return changed
+    return _edit_moderation_file(lambda terms: [t for t in terms if t != term] if term in terms else None)
+
+def _edit_moderation_file(edit) -> bool:
+    with _MOD_LOCK:
+        data = _safe_load_json(_MOD_PATH)
+        data = data if isinstance(data, dict) else {}
+        terms = edit([t for t in (data.get("forbidden") or []) if isinstance(t, str)])
+        if terms is None:
+            return False
+        data["forbidden"] = terms
+        tmp = f"{_MOD_PATH}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, _MOD_PATH)
+    notify_changed(_MOD_PATH)
+    return True
+
+# ----- الاستيراد والتصدير الجماعي -----
+def export_rows(kind: str):
+    """صفوف "words" كـ (key, reply) أو "forbidden" كـ (term,)؛ مؤشر كسول مع SQLite."""
+    store = get_store()
+    if store is not None:
+        return store.iter_rows(kind)
+    if kind == "words":
+        data = _safe_load_json(_WORDS_PATH)
+        data = data if isinstance(data, dict) else {}
+        return ((k, v) for k, v in data.items() if isinstance(k, str) and isinstance(v, str))
+    return ((t,) for t in forbidden_terms())
+
+def bulk_import(kind: str, batches, replace: bool = False) -> int:
+    """
+    يطبّق كل الدفعات بكتابة ذرّية واحدة (معاملة واحدة أو إعادة كتابة الملف مرة واحدة)،
+    فتُعاد بناء المطابقة مرة واحدة لا مرة لكل صف. يعيد عدد المدخلات التي أُضيفت أو تغيّرت أو حُذفت.
+    الملف المرفوع يُقرأ ويُتحقق منه كاملًا قبل أخذ أي قفل، فلا يؤخر الرفع البطيء الرسائل.
+    """
+    store = get_store()
+    if store is not None:
+        changed = store.bulk_import(kind, batches, replace)
+        if changed and kind == "forbidden":
+            _load_mod()
+        return changed
+    if kind == "forbidden":
+        incoming = dict.fromkeys(t for batch in batches for (t,) in batch)
+        changed = 0
+
+        def merge(terms):
+            nonlocal changed
+            merged = dict.fromkeys([] if replace else terms)
+            merged.update(incoming)
+            changed = len(merged.keys() ^ set(terms))
+            return list(merged) if changed else None
+
+        _edit_moderation_file(merge)
+        return changed
+    incoming = {}
+    for batch in batches:
+        incoming.update(batch)
+    with _ENGINE_LOCK:
+        old = _safe_load_json(_WORDS_PATH)
+        old = old if isinstance(old, dict) else {}
+        data = {} if replace else dict(old)
+        data.update(incoming)
+        changed = sum(1 for k in data.keys() | old.keys() if data.get(k) != old.get(k))
+        if not changed:
+            return 0
+        tmp = f"{_WORDS_PATH}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, _WORDS_PATH)
+    notify_changed(_WORDS_PATH)
+    return changed
+
+# ----- فهارس البحث في لوحة الإدارة -----
+_ADMIN_INDEX = {}   # kind -> (rev, KeyIndex)
+
+def content_revision(kind: str) -> str:
+    """
+    رقم مراجعة ثابت بين العمّال لمحتوى "words" أو "forbidden" (لـ ETag):
+    مراجعة القاعدة مع SQLite، وتوقيع الملف (الحجم ووقت التعديل) مع JSON.
+    """
+    store = get_store()
+    if store is not None:
+        return f"db:{store.revision(kind, fresh=True)}"
+    return repr(file_key(_WORDS_PATH if kind == "words" else _MOD_PATH))
+
+def admin_index(kind: str):
+    """(rev, KeyIndex) لكلمات الردود (مع قيمها) أو قائمة المنع؛ يُبنى مرة لكل مراجعة."""
+    rev = content_revision(kind)
+    cached = _ADMIN_INDEX.get(kind)
+    if cached is not None and cached[0] == rev:
+        return cached
+    if kind == "words":
+        store = get_store()
+        data = store.words() if store is not None else _safe_load_json(_WORDS_PATH)
+        data = {k: v for k, v in data.items() if isinstance(k, str)} if isinstance(data, dict) else {}
+    else:
+        data = forbidden_terms()
+    cached = _ADMIN_INDEX[kind] = (rev, KeyIndex(data))
+    return cached
+
+def recent_changes(limit: int = 20) -> list:
+    """آخر التعديلات من سجل القاعدة [(rev, kind, op, key, value)]، أو [] مع ملفات JSON."""
+    store = get_store()
+    return store.recent_changes(limit) if store is not None else []
+
+# ----- قواعد القروبات (groups.json) -----
+def _load_groups():
+    global _GROUPS, _G_STAMP
+    stamp = _watcher.version(_GROUPS_PATH)
+    if _GROUPS is not None and _G_STAMP == stamp:
+        return
+    with _GROUPS_LOCK:
+        if _GROUPS is not None and _G_STAMP == stamp:
+            return
+        data = _safe_load_json(_GROUPS_PATH)
+        _GROUPS = {k: v for k, v in (data if isinstance(data, dict) else {}).items()
+                   if isinstance(k, str) and isinstance(v, dict)}
+        _G_STAMP = stamp
+        registry.inc("linebot_reloads_total", kind="groups")
+
+def _group_overlay(source_id):
+    """
+    يعيد (key, overlay) للقروب إن كانت له قواعد خاصة، وإلا (None, None).
+    overlay = {"engine": ReplyEngine, "automaton": AhoCorasick, "warning": str|None}
+    يُجمّع عند أول استخدام ويُحفظ في LRU محدود (القروبات الخاملة تُحذف أولًا).
+    """
+    if not source_id:
+        return None, None
+    _load_groups()
+    rules = _GROUPS.get(source_id)
+    if rules is None:
+        return None, None
+    key = (source_id, _G_STAMP)
+    overlay = _GROUP_CACHE.get(key)
+    if overlay is None:
+        t0 = time.perf_counter()
+        regex = {translate_ar(k): v for k, v in (rules.get("regex") or {}).items() if isinstance(k, str) and v}
+        automaton = AhoCorasick()
+        for x in rules.get("forbidden") or []:
+            if isinstance(x, str):
+                automaton.add(normalize_ar(x), x)
+        automaton.build()
+        overlay = {
+            "engine": ReplyEngine(_norm_section(rules.get("exact")), _norm_section(rules.get("contains")),
+                                  regex, rules.get("fallback") or None),
+            "automaton": automaton,
+            "warning": rules.get("warning") or None,
+        }
+        _GROUP_CACHE.put(key, overlay)
+        registry.observe("linebot_stage_seconds", time.perf_counter() - t0, stage="group_compile")
+    return key, overlay
+
+def preload():
+    """
+    يُستدعى في عملية gunicorn الأم قبل fork (gunicorn.conf.py): يبني المحركات أو يحمّلها
+    من اللقطة، ثم gc.freeze() حتى لا يلمس جامع القمامة في العمّال صفحاتها فتبقى مشتركة (copy-on-write).
+    """
+    _load_engine()
+    _load_mod()
+    _load_groups()
+    if hasattr(gc, "freeze"):
+        gc.collect()
+        gc.freeze()
 
 # ---------- API المستخدمة في main.py ----------
-def check_forbidden(text: str) -> bool:
+def allow_warning(source_id):
+    """(allowed, suppressed): هل يُرسل تحذير لهذا المصدر الآن، وكم تحذيرًا حُجب قبله."""
+    _load_mod()
+    return _WARN_LIMITER.take(source_id)
+
+def allow_reply(source_id) -> bool:
+    _load_mod()
+    return _REPLY_LIMITER.take(source_id)[0]
+
+def find_forbidden(text: str, source_id: str = None):
+    """
+    يعيد أول كلمة ممنوعة في النص كـ Match(term, start, end, value) أو None.
+    term هي الكلمة بعد التطبيع، value هي الكلمة كما كُتبت في moderation.json،
+    والمواضع داخل النص بعد التطبيع.
+    مع source_id تُفحص أيضًا الكلمات الخاصة بالقروب (groups.json) قبل القائمة العامة.
+    """
     _load_mod()
     t = normalize_ar(text or "")
-    for bad in _MOD.get("forbidden", []):
-        if bad and bad in t:
-            return True
-    return False
+    _HITS.total("forbidden_checks")
+    hit = None
+    _, overlay = _group_overlay(source_id)
+    if overlay is not None and overlay["automaton"]:
+        hit = overlay["automaton"].find(t)
+    hit = hit or _MOD["automaton"].find(t)
+    if hit:
+        _HITS.hit("forbidden", hit.term)
+    return hit
 
-def get_warning_message() -> str:
+def find_blocked_link(text: str):
+    """
+    أول رابط نطاقه محظور (blocked_domains أو BLOCKLIST_FILE) كـ Match(term, start, end, value) أو None.
+    term هي القاعدة المطابقة (مثل *.spam.example)، value هو النطاق، والمواضع داخل النص كما وصل.
+    """
     _load_mod()
-    return _MOD.get("warning", "⚠️ الرجاء عدم استخدام الكلمات المخالفة.")
+    hit = _MOD["domains"].find(text or "")
+    if hit:
+        _HITS.hit("link", hit.term)
+    return hit
 
-def get_auto_reply(message: str):
+def find_repeated(text: str, source_id: str, user_id: str):
     """
-    يعيد الرد المناسب أو None.
-    يعيد تحميل words.json تلقائيًا عند تغيّره.
+    يسجّل الرسالة ويعيد Match(term="repeat", start, end, value=عدد التكرار) إن كرر المستخدم
+    النص نفسه (بعد التطبيع) أكثر من max_repeats مرة خلال window_seconds في هذا القروب، وإلا None.
+    الرسائل الأقصر من min_length (ردود قصيرة مثل "شكرا") لا تُحسب.
+    """
+    if not source_id or not user_id:
+        return None
+    _load_mod()
+    cfg = _MOD["flood"]
+    t = normalize_ar(text or "")
+    if cfg["max_repeats"] <= 0 or len(t) < cfg["min_length"]:
+        return None
+    count = _REPEATS.hit((source_id, user_id), hash(t))
+    if count <= cfg["max_repeats"]:
+        return None
+    _HITS.total("repeats")
+    return Match("repeat", 0, len(t), int(count))
+
+def check_forbidden(text: str, source_id: str = None) -> bool:
+    return find_forbidden(text, source_id) is not None
+
+def get_warning_message(source_id: str = None, reason: str = None) -> str:
+    """reason="repeat": تحذير التكرار (flood.warning) إن ضُبط."""
+    _load_mod()
+    if reason == "repeat" and _MOD["flood"]["warning"]:
+        return _MOD["flood"]["warning"]
+    _, overlay = _group_overlay(source_id)
+    if overlay is not None and overlay["warning"]:
+        return overlay["warning"]
+    return _MOD.get("warning", _DEFAULT_WARNING)
+
+def match_reply(message: str, contains_all: bool = False, source_id: str = None):
+    """
+    يعيد Reply(text, strategy, key) أو None.
+    الأولوية: الأوامر (!time / !date) ثم exact ثم contains ثم regex ثم fallback.
+    يعيد تحميل words.json و replies.json تلقائيًا عند تغيّرهما.
+    contains_all=True: كل مفاتيح words.json تُطابق بالاحتواء (سلوك app.py القديم).
+    source_id: قواعد القروب/الغرفة في groups.json (إن وُجدت) تتقدّم على القواعد العامة.
     """
     if not message:
         return None
 
-    _load_words()  # <-- هنا السحر: إعادة التحميل عند الحاجة
+    _load_engine()  # <-- هنا السحر: إعادة البناء عند الحاجة
+    # المحرك وختمه من لقطة واحدة: إعادة بناء بين قراءتين كانت تخزّن رد المحرك القديم تحت الختم الجديد
+    stamp, engine = _engine_all() if contains_all else _E_CURRENT
+    group_key, overlay = _group_overlay(source_id)
+    if overlay is not None:
+        engine = OverlayEngine(overlay["engine"], engine)
     raw = (message or "").strip()
     text = normalize_ar(raw)
 
-    # أوامر سريعة
-    if raw.strip() == "!time" or text == "!time":
-        now = datetime.datetime.utcnow() + datetime.timedelta(hours=3)  # UTC+3
-        return f"الوقت الآن: {now.strftime('%H:%M:%S')} ⏱"
+    # أوامر سريعة (خارج الكاش)
+    if raw in _TIME_COMMANDS or text in _TIME_COMMANDS:
+        hit = _time_command(raw if raw in _TIME_COMMANDS else text)
+    else:
+        key = (text, stamp, contains_all, group_key)
+        hit = _REPLY_CACHE.get(key)
+        if hit is None:
+            hit = engine.match(text) or _NO_REPLY
+            _REPLY_CACHE.put(key, hit)
+        hit = None if hit is _NO_REPLY else hit
+
+    # العدّ بعد الكاش حتى تُحسب الرسائل المكررة أيضًا
+    _HITS.total("messages")
+    if hit:
+        _HITS.total("matched")
+        _HITS.total(f"matched_{hit.strategy}")
+        _HITS.hit(hit.strategy, hit.key)
+    return hit
+
+def _time_command(cmd: str):
+    now = datetime.datetime.utcnow() + datetime.timedelta(hours=3)  # UTC+3
+    if cmd == "!time":
+        return Reply(f"الوقت الآن: {now.strftime('%H:%M:%S')} ⏱", "command", "!time")
+    return Reply(f"تاريخ اليوم: {now.strftime('%Y-%m-%d')} 📅", "command", "!date")
+
+def reply_cache_stats() -> dict:
+    return _REPLY_CACHE.stats()
+
+def hit_report(limit: int = 20) -> dict:
+    """
+    ملخص الاستخدام للوحة الإدارة (كل العمّال): أكثر المفاتيح وكلمات المنع تطابقًا،
+    المفاتيح والكلمات التي لم تُطابق أبدًا (بعد التطبيع)، ونسبة الرسائل التي وُجد لها رد.
+    """
+    _load_engine()
+    _load_mod()
+    exact, contains, regex, _ = _E_INPUTS
+    counts = {s: _HITS.counts(s) for s in ("exact", "contains", "regex", "command")}
+    used = set().union(*counts.values())
+    configured = dict.fromkeys(list(exact) + list(contains) + list(regex))
+    forbidden = _HITS.counts("forbidden")
+    totals = _HITS.totals()
+    messages = totals.get("messages", 0)
+    checks = totals.get("forbidden_checks", 0)
+
+    dead = [k for k in configured if k not in used]
+    dead_forbidden = [t for t in _MOD["forbidden"] if t not in forbidden]
+    return {
+        "top": sorted(((n, s, k) for s, c in counts.items() for k, n in c.items()), reverse=True)[:limit],
+        "top_forbidden": sorted(((n, t) for t, n in forbidden.items()), reverse=True)[:limit],
+        "dead": dead[:limit],
+        "dead_count": len(dead),
+        "dead_forbidden": dead_forbidden[:limit],
+        "dead_forbidden_count": len(dead_forbidden),
+        "keys_count": len(configured),
+        "forbidden_count": len(_MOD["forbidden"]),
+        "totals": totals,
+        "match_rate": totals.get("matched", 0) / messages if messages else None,
+        "forbidden_rate": sum(forbidden.values()) / checks if checks else None,
+    }
+
+def _collect_metrics():
+    st = _REPLY_CACHE.stats()
+    yield "counter", "linebot_reply_cache_hits_total", {}, st["hits"]
+    yield "counter", "linebot_reply_cache_misses_total", {}, st["misses"]
+    gst = _GROUP_CACHE.stats()
+    yield "gauge", "linebot_group_matchers", {}, gst["size"]
+    yield "counter", "linebot_group_matcher_misses_total", {}, gst["misses"]
+
+registry.collect(_collect_metrics)
+
+def get_auto_reply(message: str, source_id: str = None):
+    """
+    يعيد الرد المناسب أو None.
+    """
+    hit = match_reply(message, source_id=source_id)
+    return hit.text if hit else None
 
-    if raw.strip() == "!date" or text == "!date":
-        today = datetime.datetime.utcnow() + datetime.timedelta(hours=3)
-        return f"تاريخ اليوم: {today.strftime('%Y-%m-%d')} 📅"
+# ---------- محوّل أحداث LINE (SDK v2 و v3 والأحداث الخفيفة) ----------
+# الحقول نفسها في الثلاثة: event.message.text و event.source.group_id / room_id / user_id
+def event_text(event) -> str:
+    message = getattr(event, "message", None)
+    return (getattr(message, "text", None) or "").strip()
 
-    # مطابقة تامة من ملف الكلمات
-    if text in (_WORDS or {}):
-        return _WORDS[text]
+def event_user_id(event) -> str:
+    return getattr(getattr(event, "source", None), "user_id", None) or ""
 
-    # (اختياري) contains خفيف لبعض الكلمات الشائعة
-    # حتى لو ما فيه تطابق تام، جرّب وجود مفتاح قصير شائع داخل النص
-    for key_norm, resp in (_WORDS or {}).items():
-        if len(key_norm) >= 2 and key_norm in text:
-            if key_norm in ("بوت", "مساعدة", "شكرا", "شكراً", "صباح", "مساء", "السلام"):
-                return resp
+def event_source_id(event) -> str:
+    """معرّف المصدر: القروب أو الغرفة أو المستخدم."""
+    src = getattr(event, "source", None)
+    return (getattr(src, "group_id", None) or getattr(src, "room_id", None)
+            or getattr(src, "user_id", None) or "")
 
-    # لا يوجد رد
-    return None
+def reply_for_event(event, contains_all: bool = False):
+    """نص الرد لحدث رسالة نصية من أي SDK، أو None."""
+    hit = match_reply(event_text(event), contains_all=contains_all, source_id=event_source_id(event))
+    return hit.text if hit else None
@@ -0,0 +1,53 @@
+# line_client.py
+# عميل MessagingApi واحد لكل عملية مع مجمّع اتصالات keep-alive
+import os
+import threading
+
+from linebot.v3.messaging import ApiClient, MessagingApi, ReplyMessageRequest
+
+
+class PooledMessagingApi:
+    """
+    يُنشئ ApiClient مرة واحدة لكل عملية (كسولًا عند أول استخدام) ويعيد استخدامه،
+    فلا يتكرر فتح الاتصال ومصافحة TLS مع كل رد.
+    بعد fork (عمّال gunicorn) يُعاد الإنشاء في العملية الابنة تلقائيًا.
+    """
+
+    def __init__(self, configuration, pool_size: int = 10,
+                 connect_timeout: float = 3.0, read_timeout: float = 10.0):
+        configuration.connection_pool_maxsize = pool_size
+        self.configuration = configuration
+        self.timeout = (connect_timeout, read_timeout)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._api = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self):
+        # لا نغلق الاتصالات الموروثة: المقابس مشتركة مع العملية الأم
+        self._pid, self._client, self._api = None, None, None
+        self._lock = threading.Lock()
+
+    @property
+    def api(self) -> MessagingApi:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._client = ApiClient(self.configuration)
+                    self._api = MessagingApi(self._client)
+                    self._pid = os.getpid()
+        return self._api
+
+    def reply(self, reply_token: str, messages):
+        return self.api.reply_message_with_http_info(
+            ReplyMessageRequest(reply_token=reply_token, messages=messages),
+            _request_timeout=self.timeout,
+        )
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._pid, self._client, self._api = None, None, None
@@ -1,26 +1,34 @@
 import os
 import json
+import time
+import hashlib
 import shutil
+from collections import namedtuple
 from pathlib import Path
 
 from flask import (
-    Flask, request, render_template_string,
-    redirect, url_for, session, abort, send_file
+    Flask, request, render_template, make_response,
+    redirect, url_for, session, abort, send_file, Response
 )
 
 # LINE SDK v3
-from linebot.v3 import WebhookHandler
-from linebot.v3.exceptions import InvalidSignatureError
-from linebot.v3.messaging import (
-    Configuration, ApiClient, MessagingApi,
-    ReplyMessageRequest, TextMessage
-)
-from linebot.v3.webhooks import (
-    MessageEvent, TextMessageContent, MemberJoinedEvent
-)
+from linebot.v3.messaging import Configuration, TextMessage
 
 # الهلبر: الردود + المنع (تأكد من وجود helper.py بنفس الدوال)
-from helper import get_auto_reply, check_forbidden, get_warning_message
+from helper import (
+    get_auto_reply, find_forbidden, find_blocked_link, find_repeated, get_warning_message, notify_changed, get_store,
+    allow_warning, allow_reply, event_source_id, event_user_id, hit_report,
+    add_forbidden_term, remove_forbidden_term, recent_changes,
+    content_revision, admin_index, export_rows, bulk_import
+)
+from bulk import KINDS, FORMATS, IMPORT_FORMATS, ImportReport, BulkImportError, guess_format, parse_batches, format_rows
+from worker import EventQueue
+from dedupe import SeenEvents
+from metrics import registry
+from events import LiteEvent, verify_signature, parse_events
+from line_client import PooledMessagingApi
+from delivery import ReplyDelivery, CircuitBreaker
+from admission import AdmissionController, MODERATION, WELCOME, AUTO_REPLY, RANK
 
 # =============================
 # تهيئة Flask + مفاتيح البيئة
@@ -33,12 +41,52 @@ CHANNEL_ACCESS_TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN")
 if not CHANNEL_SECRET or not CHANNEL_ACCESS_TOKEN:
     raise RuntimeError("ضبط المتغيرات البيئية LINE_CHANNEL_SECRET و LINE_CHANNEL_ACCESS_TOKEN مطلوب قبل التشغيل.")
 
-handler = WebhookHandler(CHANNEL_SECRET)
-configuration = Configuration(access_token=CHANNEL_ACCESS_TOKEN)
+_SECRET_BYTES = CHANNEL_SECRET.encode("utf-8")
+# LINE_API_HOST لتوجيه النداءات الصادرة إلى خادم بديل (اختبار الحمل: benchmarks/loadtest.py)
+configuration = Configuration(access_token=CHANNEL_ACCESS_TOKEN, host=os.getenv("LINE_API_HOST") or None)
+
+# عميل واحد لكل عملية مع اتصالات keep-alive:
+#   LINE_POOL_SIZE=10  LINE_CONNECT_TIMEOUT=3  LINE_READ_TIMEOUT=10
+line_api = PooledMessagingApi(
+    configuration,
+    pool_size=int(os.getenv("LINE_POOL_SIZE", "10")),
+    connect_timeout=float(os.getenv("LINE_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("LINE_READ_TIMEOUT", "10")),
+)
+
+# إعادة المحاولة عند 429/5xx/أخطاء الشبكة داخل عمر reply token، وقاطع دائرة عند تعطّل LINE API:
+#   REPLY_MAX_ATTEMPTS=3  REPLY_BACKOFF=0.25  REPLY_BACKOFF_MAX=4  BREAKER_THRESHOLD=5  BREAKER_RESET=30
+REPLY_TOKEN_TTL = float(os.getenv("REPLY_TOKEN_TTL", "50"))
+delivery = ReplyDelivery(
+    max_attempts=int(os.getenv("REPLY_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.getenv("REPLY_BACKOFF", "0.25")),
+    max_delay=float(os.getenv("REPLY_BACKOFF_MAX", "4")),
+    breaker=CircuitBreaker(
+        threshold=int(os.getenv("BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("BREAKER_RESET", "30")),
+    ),
+    on_retry=lambda attempt, reason: registry.inc("linebot_reply_retries_total", reason=reason),
+)
 
 # كلمة مرور لوحة الإدارة
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")
 
+# المعالجة غير المتزامنة: /callback يتحقق من التوقيع ويضع الأحداث في طابور ثم يرد فورًا
+#   ASYNC_WEBHOOK=1  WEBHOOK_WORKERS=4  WEBHOOK_QUEUE_SIZE=1000  REPLY_TOKEN_TTL=50
+ASYNC_WEBHOOK = os.getenv("ASYNC_WEBHOOK", "0") == "1"
+
+# أسماء المقاييس المستخدمة في مراحل المعالجة
+STAGE = "linebot_stage_seconds"
+ERRORS = "linebot_errors_total"
+
+# تجاهل الأحداث المكررة (إعادة الإرسال من LINE) حسب webhookEventId:
+#   DEDUPE_TTL=600  DEDUPE_MAX=100000  DEDUPE_FILE=/tmp/line-seen.db (اختياري، مشترك بين العمّال)
+seen_events = SeenEvents(
+    ttl=float(os.getenv("DEDUPE_TTL", "600")),
+    max_size=int(os.getenv("DEDUPE_MAX", "100000")),
+    path=os.getenv("DEDUPE_FILE") or None,
+)
+
 # =============================
 # إعداد ملف الكلمات (يدعم قرص دائم)
 # =============================
@@ -62,8 +110,12 @@ def _bootstrap_words_if_needed():
         _ensure_parent_dir(WORDS_FILE)
         shutil.copy2(SOURCE_WORDS_FILE, WORDS_FILE)
 
+# مع STORE_BACKEND=sqlite تُقرأ الكلمات وتُعدّل صفًا صفًا في القاعدة بدل إعادة كتابة الملف
 def load_words() -> dict:
     _bootstrap_words_if_needed()
+    store = get_store()
+    if store is not None:
+        return store.words()
     try:
         with open(WORDS_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -77,6 +129,7 @@ def save_words(data: dict):
     with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     Path(tmp_path).replace(WORDS_FILE)
+    notify_changed(WORDS_FILE)  # حتى يرى هذا العامل التعديل فورًا
 
 # =============================
 # مسارات عامة
@@ -85,18 +138,73 @@ def save_words(data: dict):
 def health():
     return "OK", 200
 
+# مقاييس Prometheus؛ مع عدة عمّال اضبط METRICS_DIR على مجلد مشترك
+# METRICS_TOKEN (اختياري) يشترط ترويسة Authorization: Bearer <token>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@app.route("/metrics")
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization", "") != f"Bearer {METRICS_TOKEN}":
+        abort(403)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route("/callback", methods=["POST"])
 def callback():
     signature = request.headers.get("X-Line-Signature", "")
-    body = request.get_data(as_text=True)
-    try:
-        handler.handle(body, signature)
-    except InvalidSignatureError:
+    raw = request.get_data()
+    with registry.timer(STAGE, stage="verify"):
+        valid = verify_signature(_SECRET_BYTES, raw, signature)
+    if not valid:
+        registry.inc(ERRORS, stage="verify")
         return "invalid signature", 400
+    # مسار سريع: لا نماذج SDK؛ فقط الرسائل النصية والانضمام تصل للمعالجات كأحداث خفيفة
+    try:
+        with registry.timer(STAGE, stage="parse"):
+            events, types = parse_events(raw)
+    except Exception:
+        app.logger.exception("تعذّر تحليل جسم الويبهوك")
+        registry.inc(ERRORS, stage="parse")
+        return "error", 400
+    for t in types:
+        registry.inc("linebot_events_total", type=t)
+
+    # الأحداث المُعاد إرسالها تُسقط هنا قبل أي مطابقة أو نداء API
+    events = [e for e in events if not _is_duplicate(e)]
+    # المطابقة (في الذاكرة) تحدد الرد وأولويته لكل حدث، ثم تُرسل الأهم أولًا
+    try:
+        jobs = sorted(filter(None, map(plan_event, events)), key=lambda job: RANK[job.priority])
     except Exception:
+        app.logger.exception("فشل معالجة حدث الويبهوك")
+        _forget(e.webhook_event_id for e in events)
         return "error", 400
+    for i, job in enumerate(jobs):
+        # تحت الحمل الزائد يُترك الأقل أولوية هنا، قبل الطابور وقبل أي نداء صادر
+        if not admission.admit(job.priority, job.timestamp):
+            continue
+        try:
+            if not ASYNC_WEBHOOK:
+                deliver_job(job)
+            elif not event_queue.submit(job, RANK[job.priority]):
+                app.logger.warning("طابور الأحداث ممتلئ، تم إسقاط رد %s", job.priority)
+        except Exception:
+            app.logger.exception("فشل معالجة حدث الويبهوك")
+            # ما لم يُرسل رده بعد يُعالج من جديد عند إعادة الإرسال من LINE
+            _forget(j.event_id for j in jobs[i:])
+            return "error", 400
     return "OK", 200
 
+def _forget(event_ids):
+    for event_id in event_ids:
+        seen_events.forget(event_id)
+
+def _is_duplicate(event) -> bool:
+    if seen_events.seen(getattr(event, "webhook_event_id", None)):
+        ctx = getattr(event, "delivery_context", None)
+        app.logger.info("حدث مكرر تم تجاهله %s (redelivery=%s)",
+                        event.webhook_event_id, getattr(ctx, "is_redelivery", None))
+        return True
+    return False
+
 # =============================
 # لوحة الإدارة (جلسات + كلمة مرور)
 # =============================
@@ -125,30 +233,52 @@ ADMIN_TEMPLATE = """
     <div>حالة الخدمة: <b>تشغيل ✅</b></div>
     <div>مسار الصحّة: <code>/health</code></div>
     <div>الويبهوك: <code>/callback</code></div>
-    <div class="muted">الردود من الملف: <code>{{ words_file }}</code> — قائمة المنع من: <code>moderation.json</code></div>
+    <div class="muted">الردود من الملف: <code>{{ words_file }}</code> — قائمة المنع من: <code>{{ 'قاعدة SQLite' if db_store else 'moderation.json' }}</code></div>
   </div>
 
   <div class="box">
-    <h3>الردود الحالية</h3>
-    {% if words %}
+    <h3>الاستخدام</h3>
+    <div>
+      الرسائل: <b>{{ stats.totals.get('messages', 0) }}</b> —
+      نسبة الرد: <b>{{ '%.1f%%' % (stats.match_rate * 100) if stats.match_rate is not none else '—' }}</b> —
+      نسبة المخالفات: <b>{{ '%.1f%%' % (stats.forbidden_rate * 100) if stats.forbidden_rate is not none else '—' }}</b>
+    </div>
+    <div class="muted">تُجمّع الأرقام من كل العمّال وقد تتأخر حتى دورة الحفظ التالية.</div>
+    <table style="margin-top:10px">
+      <tr><th>الأكثر استخدامًا</th><th>الطريقة</th><th style="width:110px">المرات</th></tr>
+      {% for n, strategy, key in stats.top %}
+      <tr><td>{{ key }}</td><td>{{ strategy }}</td><td>{{ n }}</td></tr>
+      {% else %}
+      <tr><td colspan="3" class="muted">لا توجد بيانات بعد.</td></tr>
+      {% endfor %}
+    </table>
+    <p>
+      مفاتيح لم تُستخدم أبدًا: <b>{{ stats.dead_count }}</b> من {{ stats.keys_count }}
+      {% if stats.dead %}<br><span class="muted">{{ stats.dead | join('، ') }}{% if stats.dead_count > stats.dead | length %} …{% endif %}</span>{% endif %}
+    </p>
     <table>
-      <tr><th>الكلمة</th><th>الرد</th><th style="width:110px">حذف</th></tr>
-      {% for key, value in words.items() %}
-      <tr>
-        <td>{{ key }}</td>
-        <td>{{ value }}</td>
-        <td>
-          <form method="post" action="{{ url_for('admin_delete') }}" style="display:inline">
-            <input type="hidden" name="word" value="{{ key }}">
-            <button type="submit">حذف</button>
-          </form>
-        </td>
-      </tr>
+      <tr><th>كلمات المنع الأكثر رصدًا</th><th style="width:110px">المرات</th></tr>
+      {% for n, term in stats.top_forbidden %}
+      <tr><td>{{ term }}</td><td>{{ n }}</td></tr>
+      {% else %}
+      <tr><td colspan="2" class="muted">لا توجد بيانات بعد.</td></tr>
       {% endfor %}
     </table>
-    {% else %}
-      <div>🚫 لا توجد ردود حالياً.</div>
-    {% endif %}
+    <p>
+      كلمات منع لم تُرصد أبدًا: <b>{{ stats.dead_forbidden_count }}</b> من {{ stats.forbidden_count }}
+      {% if stats.dead_forbidden %}<br><span class="muted">{{ stats.dead_forbidden | join('، ') }}{% if stats.dead_forbidden_count > stats.dead_forbidden | length %} …{% endif %}</span>{% endif %}
+    </p>
+  </div>
+
+  <div class="box">
+    <h3>الردود الحالية</h3>
+    <div>عدد الردود: <b>{{ words_count }}</b> — <a href="{{ url_for('admin_words') }}">عرض وبحث ←</a></div>
+    <form method="get" action="{{ url_for('admin_words') }}" style="margin-top:10px">
+      <div style="display:grid; grid-template-columns: 3fr 140px; gap:10px; align-items:center;">
+        <input type="text" name="q" placeholder="ابحث في الكلمات">
+        <button type="submit">بحث</button>
+      </div>
+    </form>
   </div>
 
   <div class="box">
@@ -170,11 +300,58 @@ ADMIN_TEMPLATE = """
     </form>
   </div>
 
+  <div class="box">
+    <h3>قائمة المنع</h3>
+    <div>عدد الكلمات الممنوعة: <b>{{ forbidden_count }}</b> — <a href="{{ url_for('admin_forbidden') }}">عرض وبحث ←</a></div>
+    <form method="post" action="{{ url_for('admin_forbidden_add') }}" style="margin-top:10px">
+      <div style="display:grid; grid-template-columns: 3fr 140px; gap:10px; align-items:center;">
+        <input type="text" name="term" placeholder="كلمة أو عبارة ممنوعة" required>
+        <button type="submit">إضافة</button>
+      </div>
+    </form>
+  </div>
+
+  <div class="box">
+    <h3>سجل التعديلات</h3>
+    {% if db_store %}
+      {% if changes %}
+      <table>
+        <tr><th style="width:80px">المراجعة</th><th>النوع</th><th>العملية</th><th>المفتاح</th><th>القيمة</th></tr>
+        {% for rev, kind, op, key, value in changes %}
+        <tr><td>{{ rev }}</td><td>{{ kind }}</td><td>{{ op }}</td><td>{{ key }}</td><td>{{ value or '' }}</td></tr>
+        {% endfor %}
+      </table>
+      {% else %}
+        <div class="muted">لا توجد تعديلات بعد.</div>
+      {% endif %}
+    {% else %}
+      <div class="muted">السجل والتطبيق الفوري للتعديلات على كل العمّال متاحان مع <code>STORE_BACKEND=sqlite</code>؛ مع ملفات JSON يُعاد تحميل الملف كاملًا.</div>
+    {% endif %}
+  </div>
+
   <div class="box">
     <h3>ملفات البيانات</h3>
     <p>
       <a href="{{ url_for('download_words') }}">⤓ تحميل نسخة من words.json</a>
     </p>
+    <p>
+      تصدير الردود: <a href="{{ url_for('admin_export', kind='words', format='jsonl') }}">JSONL</a> ·
+      <a href="{{ url_for('admin_export', kind='words', format='csv') }}">CSV</a>
+      — قائمة المنع: <a href="{{ url_for('admin_export', kind='forbidden', format='jsonl') }}">JSONL</a> ·
+      <a href="{{ url_for('admin_export', kind='forbidden', format='csv') }}">CSV</a>
+    </p>
+    <form method="post" action="{{ url_for('admin_import') }}" enctype="multipart/form-data">
+      <div style="display:grid; grid-template-columns: 1fr 2fr 1fr 140px; gap:10px; align-items:center;">
+        <select name="kind">
+          <option value="words">الردود (key, reply)</option>
+          <option value="forbidden">قائمة المنع (term)</option>
+        </select>
+        <input type="file" name="file" accept=".jsonl,.ndjson,.csv,.json" required>
+        <label><input type="checkbox" name="replace" value="1"> استبدال القائمة كلها</label>
+        <button type="submit">استيراد</button>
+      </div>
+    </form>
+    <div class="muted">سطر لكل مدخل: JSONL مثل <code>{"key": "...", "reply": "..."}</code> أو <code>{"term": "..."}</code>، أو CSV بنفس الأعمدة، أو ملف <code>words.json</code> / <code>moderation.json</code> كما يُحمّل من هنا. الأسطر المرفوضة تُعرض مع أرقامها، والباقي يُكتب دفعة واحدة.</div>
   </div>
 
   <form method="post" action="{{ url_for('admin_logout') }}">
@@ -211,6 +388,127 @@ LOGIN_TEMPLATE = """
 </html>
 """
 
+LIST_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+  <meta charset="utf-8">
+  <title>{{ title }}</title>
+  <style>
+    body { font-family: sans-serif; max-width: 900px; margin: 24px auto; }
+    table { border-collapse: collapse; width: 100%; }
+    th, td { border: 1px solid #ddd; padding: 8px; }
+    th { background: #f7f7f7; }
+    input[type=text] { width: 100%; padding: 6px; }
+    .box { border: 1px solid #ddd; border-radius: 12px; padding: 16px; margin-bottom: 16px; }
+    .muted { color:#666; }
+    button { padding:8px 14px; cursor:pointer; }
+    .pager { display:flex; gap:16px; align-items:center; margin-top:12px; }
+  </style>
+</head>
+<body>
+  <h2>{{ title }}</h2>
+  <p><a href="{{ url_for('admin_home') }}">→ لوحة التحكم</a></p>
+
+  <div class="box">
+    <form method="get">
+      <div style="display:grid; grid-template-columns: 3fr 1fr 120px; gap:10px; align-items:center;">
+        <input type="text" name="q" value="{{ q }}" placeholder="ابحث (بعد التطبيع: الهمزات والتشكيل لا تهم)">
+        <select name="mode">
+          <option value="contains" {% if mode != 'prefix' %}selected{% endif %}>يحتوي</option>
+          <option value="prefix" {% if mode == 'prefix' %}selected{% endif %}>يبدأ بـ</option>
+        </select>
+        <button type="submit">بحث</button>
+      </div>
+    </form>
+  </div>
+
+  <div class="box">
+    <div class="muted">{{ total }} نتيجة — صفحة {{ page }} من {{ pages }}</div>
+    {% if rows %}
+    <table style="margin-top:10px">
+      <tr><th>{{ key_label }}</th>{% if show_values %}<th>الرد</th>{% endif %}<th style="width:110px">حذف</th></tr>
+      {% for key, value in rows %}
+      <tr>
+        <td>{{ key }}</td>
+        {% if show_values %}<td>{{ value }}</td>{% endif %}
+        <td>
+          <form method="post" action="{{ delete_url }}" style="display:inline">
+            <input type="hidden" name="{{ field }}" value="{{ key }}">
+            <input type="hidden" name="next" value="{{ here }}">
+            <button type="submit">حذف</button>
+          </form>
+        </td>
+      </tr>
+      {% endfor %}
+    </table>
+    {% else %}
+      <div>🚫 لا توجد نتائج.</div>
+    {% endif %}
+    <div class="pager">
+      {% if page > 1 %}<a href="{{ url_for(endpoint, q=q, mode=mode, page=page - 1) }}">→ السابق</a>{% endif %}
+      {% if page < pages %}<a href="{{ url_for(endpoint, q=q, mode=mode, page=page + 1) }}">التالي ←</a>{% endif %}
+    </div>
+  </div>
+</body>
+</html>
+"""
+
+IMPORT_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+  <meta charset="utf-8">
+  <title>نتيجة الاستيراد</title>
+  <style>
+    body { font-family: sans-serif; max-width: 900px; margin: 24px auto; }
+    table { border-collapse: collapse; width: 100%; }
+    th, td { border: 1px solid #ddd; padding: 8px; }
+    th { background: #f7f7f7; }
+    .box { border: 1px solid #ddd; border-radius: 12px; padding: 16px; margin-bottom: 16px; }
+    .muted { color:#666; }
+    .err { color: crimson; }
+  </style>
+</head>
+<body>
+  <h2>نتيجة استيراد {{ 'الردود' if kind == 'words' else 'قائمة المنع' }} ({{ fmt }})</h2>
+  <p><a href="{{ url_for('admin_home') }}">→ لوحة التحكم</a></p>
+
+  <div class="box">
+    {% if report.aborted %}
+      <div class="err">أُلغي الاستيراد ولم يتغيّر شيء: {{ report.aborted }}</div>
+    {% endif %}
+    <div>الأسطر: <b>{{ report.rows }}</b> — المقبولة: <b>{{ report.accepted }}</b> —
+      المرفوضة: <b>{{ report.error_count }}</b> — التي غيّرت القائمة: <b>{{ report.written }}</b></div>
+  </div>
+
+  {% if report.errors %}
+  <div class="box">
+    <table>
+      <tr><th style="width:90px">السطر</th><th>السبب</th></tr>
+      {% for line, reason in report.errors %}
+      <tr><td>{{ line }}</td><td>{{ reason }}</td></tr>
+      {% endfor %}
+    </table>
+    {% if report.error_count > report.errors | length %}
+      <div class="muted">… و{{ report.error_count - report.errors | length }} سطرًا آخر.</div>
+    {% endif %}
+  </div>
+  {% endif %}
+</body>
+</html>
+"""
+
+# القوالب تُجمّع مرة واحدة عند التشغيل بدل كل طلب (render_template_string يعيد التجميع دائمًا)
+_ADMIN_TPL = app.jinja_env.from_string(ADMIN_TEMPLATE)
+_LOGIN_TPL = app.jinja_env.from_string(LOGIN_TEMPLATE)
+_LIST_TPL = app.jinja_env.from_string(LIST_TEMPLATE)
+_IMPORT_TPL = app.jinja_env.from_string(IMPORT_TEMPLATE)
+_LIST_TPL_TAG = hashlib.sha1(LIST_TEMPLATE.encode("utf-8")).hexdigest()[:8]
+
+# عدد الصفوف في كل صفحة من قوائم الإدارة
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+
 # -----------------------------
 # دوال/مسارات الإدارة
 # -----------------------------
@@ -218,20 +516,69 @@ LOGIN_TEMPLATE = """
 def admin_home():
     if not session.get("admin_ok"):
         return redirect(url_for("admin_login"))
-    words = load_words()
-    return render_template_string(ADMIN_TEMPLATE, words=words, words_file=WORDS_FILE)
+    _bootstrap_words_if_needed()
+    return render_template(
+        _ADMIN_TPL, words_file=WORDS_FILE, stats=hit_report(),
+        words_count=len(admin_index("words")[1]), forbidden_count=len(admin_index("forbidden")[1]),
+        changes=recent_changes(), db_store=get_store() is not None,
+    )
+
+def _admin_list(kind: str, endpoint: str):
+    """
+    صفحة واحدة من نتائج البحث. ETag من (مراجعة المحتوى، البحث، الصفحة، القالب):
+    إن لم يتغيّر شيء يرد 304 دون بناء الفهرس أو عرض القالب.
+    """
+    if not session.get("admin_ok"):
+        return redirect(url_for("admin_login"))
+    if kind == "words":
+        _bootstrap_words_if_needed()
+    q = (request.args.get("q") or "").strip()
+    mode = "prefix" if request.args.get("mode") == "prefix" else "contains"
+    page = max(1, request.args.get("page", 1, type=int) or 1)
+    tag = hashlib.sha1(repr((kind, content_revision(kind), q, mode, page, ADMIN_PAGE_SIZE, _LIST_TPL_TAG))
+                       .encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(tag):
+        resp = Response(status=304)
+    else:
+        total, rows = admin_index(kind)[1].search(q, (page - 1) * ADMIN_PAGE_SIZE, ADMIN_PAGE_SIZE, mode)
+        words = kind == "words"
+        resp = make_response(render_template(
+            _LIST_TPL, title="الردود" if words else "قائمة المنع", rows=rows, total=total,
+            q=q, mode=mode, page=page, pages=max(1, -(-total // ADMIN_PAGE_SIZE)),
+            endpoint=endpoint, here=request.full_path, show_values=words,
+            key_label="الكلمة" if words else "الكلمة الممنوعة", field="word" if words else "term",
+            delete_url=url_for("admin_delete" if words else "admin_forbidden_delete"),
+        ))
+    resp.set_etag(tag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+@app.get("/admin/words")
+def admin_words():
+    return _admin_list("words", "admin_words")
+
+@app.get("/admin/forbidden")
+def admin_forbidden():
+    return _admin_list("forbidden", "admin_forbidden")
+
+def _back_to_list():
+    # بعد الحذف من صفحة بحث نعود لنفس الصفحة (مسارات /admin فقط)
+    nxt = request.form.get("next") or ""
+    if nxt.startswith("/admin/") and not nxt.startswith("//"):
+        return redirect(nxt)
+    return redirect(url_for("admin_home"))
 
 @app.route("/admin/login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "GET":
-        return render_template_string(LOGIN_TEMPLATE, error=None)
+        return render_template(_LOGIN_TPL, error=None)
     pwd = request.form.get("password", "")
     if not ADMIN_PASSWORD:
-        return render_template_string(LOGIN_TEMPLATE, error="ADMIN_PASSWORD غير مضبوط في بيئة Render"), 500
+        return render_template(_LOGIN_TPL, error="ADMIN_PASSWORD غير مضبوط في بيئة Render"), 500
     if pwd == ADMIN_PASSWORD:
         session["admin_ok"] = True
         return redirect(url_for("admin_home"))
-    return render_template_string(LOGIN_TEMPLATE, error="كلمة المرور غير صحيحة"), 403
+    return render_template(_LOGIN_TPL, error="كلمة المرور غير صحيحة"), 403
 
 @app.post("/admin/logout")
 def admin_logout():
@@ -246,6 +593,10 @@ def admin_add():
     reply = (request.form.get("reply") or "").strip()
     if not word or not reply:
         return redirect(url_for("admin_home"))
+    store = get_store()
+    if store is not None:
+        store.upsert_word(word, reply)
+        return redirect(url_for("admin_home"))
     words = load_words()
     words[word] = reply
     save_words(words)
@@ -256,16 +607,45 @@ def admin_delete():
     if not session.get("admin_ok"):
         return redirect(url_for("admin_login"))
     word = (request.form.get("word") or "").strip()
+    store = get_store()
+    if store is not None:
+        store.delete_word(word)
+        return _back_to_list()
     words = load_words()
     if word in words:
         del words[word]
         save_words(words)
+    return _back_to_list()
+
+@app.post("/admin/forbidden/add")
+def admin_forbidden_add():
+    if not session.get("admin_ok"):
+        return redirect(url_for("admin_login"))
+    term = (request.form.get("term") or "").strip()
+    if term:
+        add_forbidden_term(term)
     return redirect(url_for("admin_home"))
 
+@app.post("/admin/forbidden/delete")
+def admin_forbidden_delete():
+    if not session.get("admin_ok"):
+        return redirect(url_for("admin_login"))
+    term = (request.form.get("term") or "").strip()
+    if term:
+        remove_forbidden_term(term)
+    return _back_to_list()
+
 @app.get("/admin/download-words")
 def download_words():
     if not session.get("admin_ok"):
         return redirect(url_for("admin_login"))
+    store = get_store()
+    if store is not None:
+        return Response(
+            json.dumps(store.words(), ensure_ascii=False, indent=2),
+            mimetype="application/json; charset=utf-8",
+            headers={"Content-Disposition": "attachment; filename=words.json"},
+        )
     p = Path(WORDS_FILE)
     if not p.exists():
         return "الملف غير موجود على السيرفر.", 404
@@ -276,49 +656,171 @@ def download_words():
         mimetype="application/json; charset=utf-8"
     )
 
+@app.post("/admin/import")
+def admin_import():
+    """
+    يقرأ الملف المرفوع سطرًا سطرًا ويتحقق منه على دفعات، ثم يكتب كل الصالح بكتابة ذرّية واحدة.
+    مع replace=1 يُلغى الاستيراد كله إن رُفض أي سطر.
+    """
+    if not session.get("admin_ok"):
+        return redirect(url_for("admin_login"))
+    kind = request.form.get("kind")
+    upload = request.files.get("file")
+    if kind not in KINDS or upload is None or not upload.filename:
+        return redirect(url_for("admin_home"))
+    fmt = request.form.get("format")
+    fmt = fmt if fmt in IMPORT_FORMATS else guess_format(upload.filename)
+    replace = request.form.get("replace") == "1"
+    if kind == "words":
+        _bootstrap_words_if_needed()
+    report = ImportReport()
+    status = 200
+    try:
+        report.written = bulk_import(kind, parse_batches(upload.stream, fmt, kind, report, strict=replace), replace)
+    except BulkImportError:
+        status = 422
+    return render_template(_IMPORT_TPL, kind=kind, fmt=fmt, report=report), status
+
+@app.get("/admin/export/<kind>")
+def admin_export(kind: str):
+    """تصدير متدفق: يُكتب الملف صفًا صفًا إلى الاستجابة دون تجميعه في الذاكرة."""
+    if not session.get("admin_ok"):
+        return redirect(url_for("admin_login"))
+    fmt = request.args.get("format", "jsonl")
+    if kind not in KINDS or fmt not in FORMATS:
+        abort(404)
+    if kind == "words":
+        _bootstrap_words_if_needed()
+    return Response(
+        format_rows(export_rows(kind), fmt, kind),
+        mimetype="text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+    )
+
 # =============================
 # معالجات LINE
 # =============================
-@handler.add(MessageEvent, message=TextMessageContent)
-def on_text(event: MessageEvent):
+# رد جاهز للإرسال: الأولوية تحدد ترتيبه وهل يُترك تحت الضغط (admission.py)
+ReplyJob = namedtuple("ReplyJob", "priority reply_token text timestamp event_id")
+
+def send_reply(reply_token: str, text: str, timestamp=None) -> bool:
+    """
+    يرسل الرد عبر طبقة delivery؛ timestamp (بالملّي ثانية من الحدث) يحدد آخر وقت لإعادة المحاولة.
+    الفشل النهائي يُسجّل ويُعدّ ولا يُرفع، حتى لا يرد /callback بخطأ فتعيد LINE إرسال الحدث.
+    """
+    start = timestamp / 1000.0 if timestamp else time.time()
+    with registry.timer(STAGE, stage="reply"):
+        ok, outcome = delivery.deliver(
+            lambda: line_api.reply(reply_token, [TextMessage(text=text)]),
+            deadline=start + REPLY_TOKEN_TTL,
+        )
+    if ok:
+        registry.inc("linebot_replies_total", outcome="success")
+    else:
+        registry.inc("linebot_replies_total", outcome="dropped")
+        registry.inc("linebot_reply_drops_total", reason=outcome)
+        registry.inc(ERRORS, stage="reply")
+        app.logger.warning("تم إسقاط رد (%s)", outcome)
+    return ok
+
+def plan_text(event: LiteEvent):
+    """يعيد ReplyJob (تحذير منع أو رد تلقائي) أو None؛ لا نداءات صادرة هنا."""
     txt = (event.message.text or "").strip()
+    source_id = event_source_id(event)
 
     # تنبيه داخل القروبات/الغرف عند كلمات ممنوعة
     src_type = getattr(event.source, "type", None)
     if src_type in ("group", "room"):
-        if check_forbidden(txt):
-            warn = get_warning_message()
-            with ApiClient(configuration) as client:
-                MessagingApi(client).reply_message_with_http_info(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token,
-                        messages=[TextMessage(text=warn)]
-                    )
-                )
-            return  # لا تكمل ردود أخرى
+        reason = None
+        with registry.timer(STAGE, stage="check_forbidden"):
+            hit = find_forbidden(txt, source_id)
+        if hit:
+            app.logger.info("كلمة ممنوعة %r عند [%d:%d] في %s", hit.value, hit.start, hit.end, src_type)
+        else:
+            # روابط نطاقاتها محظورة (blocked_domains / BLOCKLIST_FILE)
+            with registry.timer(STAGE, stage="check_links"):
+                hit = find_blocked_link(txt)
+            if hit:
+                app.logger.info("رابط محظور %s (القاعدة %r) في %s", hit.value, hit.term, src_type)
+            else:
+                # المستخدم نفسه يكرر النص نفسه (لصق إعلان) خلال نافذة قصيرة
+                hit = find_repeated(txt, source_id, event_user_id(event))
+                if hit:
+                    reason = "repeat"
+                    app.logger.info("رسالة مكررة %d مرة في %s", hit.value, src_type)
+        if hit:
+            # أثناء الإغراق: تحذير واحد لكل نافذة بدل تحذير لكل رسالة
+            allowed, suppressed = allow_warning(source_id)
+            if not allowed:
+                return None
+            warn = get_warning_message(source_id, reason=reason)
+            if suppressed:
+                warn += f"\n(رُصدت {suppressed} رسالة مخالفة أخرى)"
+            return ReplyJob(MODERATION, event.reply_token, warn, event.timestamp, event.webhook_event_id)  # لا تكمل ردود أخرى
 
     # ردود تلقائية من words.json عبر helper
-    reply = get_auto_reply(txt)
+    with registry.timer(STAGE, stage="get_auto_reply"):
+        reply = get_auto_reply(txt, source_id)
     if not reply:
-        return  # لا رد إذا لا يوجد تطابق
-
-    with ApiClient(configuration) as client:
-        MessagingApi(client).reply_message_with_http_info(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text=reply)]
-            )
-        )
+        return None  # لا رد إذا لا يوجد تطابق
+    if not allow_reply(source_id):
+        return None
+    return ReplyJob(AUTO_REPLY, event.reply_token, reply, event.timestamp, event.webhook_event_id)
+
+def plan_member_joined(event: LiteEvent):
+    return ReplyJob(WELCOME, event.reply_token, "مرحبًا 👋 نورتوا القروب! ✨", event.timestamp, event.webhook_event_id)
+
+def plan_event(event: LiteEvent):
+    """
+    توجيه الحدث للمعالج المناسب، ويعيد ReplyJob أو None.
+    يقبل الأحداث الخفيفة من events.py أو نماذج SDK (نفس أسماء الحقول).
+    """
+    try:
+        if event.type == "message" and getattr(event.message, "type", None) == "text":
+            return plan_text(event)
+        if event.type == "memberJoined":
+            return plan_member_joined(event)
+        return None
+    except Exception:
+        registry.inc(ERRORS, stage="handler")
+        raise
+
+def deliver_job(job: ReplyJob) -> bool:
+    with admission.handling():
+        return send_reply(job.reply_token, job.text, job.timestamp)
+
+def _deliver_queued(job: ReplyJob):
+    # الحدث قد ينتظر في الطابور؛ يُفحص عمره مرة أخرى قبل النداء الصادر
+    if admission.admit(job.priority, job.timestamp, check_load=False):
+        deliver_job(job)
+
+event_queue = EventQueue(
+    _deliver_queued,
+    workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+    maxsize=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    max_age=REPLY_TOKEN_TTL,
+)
 
-@handler.add(MemberJoinedEvent)
-def on_member_joined(event: MemberJoinedEvent):
-    with ApiClient(configuration) as client:
-        MessagingApi(client).reply_message_with_http_info(
-            ReplyMessageRequest(
-                reply_token=event.reply_token,
-                messages=[TextMessage(text="مرحبًا 👋 نورتوا القروب! ✨")]
-            )
-        )
+# ضبط القبول لكل عامل؛ الردود التلقائية تُترك عند نصف أي ميزانية، والترحيب عند 75%، وتحذيرات المنع عند كاملها:
+#   ADMISSION_LIMIT=200   : أحداث مقبولة في الطابور أو قيد الإرسال (0 للتعطيل)
+#   ADMISSION_MAX_LAG=20  : ثوانٍ منذ إنشاء LINE للحدث (0 للتعطيل)؛ هذه الميزانية التي تعمل مع العمّال المتزامنة
+admission = AdmissionController(
+    int(os.getenv("ADMISSION_LIMIT", "200")),
+    float(os.getenv("ADMISSION_MAX_LAG", "20")),
+    backlog=event_queue.qsize,
+)
+
+def _collect_metrics():
+    yield "gauge", "linebot_queue_depth", {}, event_queue.qsize()
+    yield "counter", "linebot_queue_dropped_total", {"reason": "full"}, event_queue.dropped_full
+    yield "counter", "linebot_queue_dropped_total", {"reason": "stale"}, event_queue.dropped_stale
+    yield "counter", "linebot_duplicate_events_total", {}, seen_events.duplicates
+    yield "gauge", "linebot_circuit_open", {}, 0 if delivery.breaker.state == "closed" else 1
+    yield "gauge", "linebot_admission_load", {}, admission.load()
+    for priority, n in admission.shed.items():
+        yield "counter", "linebot_shed_total", {"priority": priority}, n
+
+registry.collect(_collect_metrics)
 
 # =============================
 # التشغيل المحلي
@@ -0,0 +1,165 @@
+# matcher.py
+# مطابقة متعددة الأنماط (Aho-Corasick) بمرور واحد على النص
+import heapq
+from collections import deque, namedtuple
+
+# التعديلات الحيّة تُجمع في آلة صغيرة جانبية، وعند تجاوزها هذا الحد (أو 1/16 من الآلة) يُعاد البناء كاملًا
+_DELTA_MIN = 64
+
+# term: النمط المطابق، start/end: موضعه داخل النص المُمرَّر (بعد التطبيع)، value: القيمة المرفقة بالنمط
+Match = namedtuple("Match", "term start end value")
+
+
+class AhoCorasick:
+    """
+    آلة Aho-Corasick بسيطة:
+      - add() لإضافة نمط (مع قيمة اختيارية)
+      - build() لحساب روابط الفشل مرة واحدة بعد الإضافة
+      - iter_matches()/find() للبحث بمرور واحد على النص
+      - insert()/remove() لتعديل نمط واحد في آلة مبنية دون إعادة بنائها (لوحة الإدارة)
+    """
+
+    def __init__(self, patterns=None):
+        self._goto = [{}]     # انتقالات كل عقدة: حرف -> عقدة
+        self._fail = [0]      # رابط الفشل لكل عقدة
+        self._own = [()]      # أرقام الأنماط المنتهية عند العقدة نفسها
+        self._out = [()]      # نفسها + ما تصل إليه سلسلة الفشل (تُحسب في build)
+        self._terms = []
+        self._values = []
+        self._index = {}      # نمط -> رقمه (لمنع التكرار)
+        self._built = True
+        self._removed = frozenset()   # أرقام أنماط محذوفة حيًّا (تُتخطى عند البحث)
+        self._delta = None            # AhoCorasick صغيرة للأنماط المضافة بعد البناء
+        if patterns:
+            items = patterns.items() if isinstance(patterns, dict) else ((p, None) for p in patterns)
+            for term, value in items:
+                self.add(term, value)
+            self.build()
+
+    def __len__(self):
+        return len(self._terms) - len(self._removed) + (len(self._delta) if self._delta else 0)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def items(self):
+        """الأنماط الحالية وقيمها (بعد التعديلات الحيّة)."""
+        out = {t: self._values[pid] for pid, t in enumerate(self._terms) if pid not in self._removed}
+        if self._delta:
+            out.update(self._delta.items())
+        return out
+
+    def add(self, term: str, value=None):
+        """يضيف نمطًا؛ النمط الفارغ يُتجاهل والمكرر يحتفظ بأول قيمة."""
+        if not term or term in self._index:
+            return
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+            node = nxt
+        pid = len(self._terms)
+        self._terms.append(term)
+        self._values.append(value)
+        self._index[term] = pid
+        self._own[node] = self._own[node] + (pid,)
+        self._built = False
+
+    def build(self):
+        """يحسب روابط الفشل ويدمج المخرجات (BFS)."""
+        goto, fail = self._goto, self._fail
+        out = self._out = list(self._own)
+        queue = deque()
+        for nxt in goto[0].values():
+            fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text: str):
+        """يُرجع كل التطابقات كـ Match بترتيب موضع النهاية."""
+        delta = self._delta
+        if delta:
+            # عند التساوي في النهاية تتقدّم الآلة الأساسية
+            return heapq.merge(self._iter_base(text), delta.iter_matches(text), key=lambda m: m.end)
+        return self._iter_base(text)
+
+    def _iter_base(self, text: str):
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        terms, values, removed = self._terms, self._values, self._removed
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for pid in out[node]:
+                    if removed and pid in removed:
+                        continue
+                    term = terms[pid]
+                    yield Match(term, end - len(term), end, values[pid])
+
+    def find(self, text: str):
+        """أول تطابق (الأقرب نهايةً) أو None."""
+        for m in self.iter_matches(text):
+            return m
+        return None
+
+    # ---------- تعديلات حيّة ----------
+    def insert(self, term: str, value=None):
+        """
+        يضيف نمطًا أو يحدّث قيمته في آلة مبنية: تحديث القيمة أو إرجاع نمط محذوف O(1)،
+        والنمط الجديد يُضاف إلى آلة جانبية صغيرة؛ حين تكبر يُعاد بناء الكل مرة واحدة.
+        الكتابة من خيط واحد (تحت قفل المستدعي)، والبحث المتزامن يرى الحالة قبل التعديل أو بعده.
+        """
+        if not term:
+            return
+        pid = self._index.get(term)
+        if pid is not None:
+            self._values[pid] = value
+            if pid in self._removed:
+                self._removed = self._removed - {pid}
+            return
+        items = self._delta.items() if self._delta else {}
+        items[term] = value
+        if len(items) > max(_DELTA_MIN, len(self._terms) // 16):
+            self._compact(items)
+        else:
+            self._delta = AhoCorasick(items)
+
+    def remove(self, term: str) -> bool:
+        """يحذف نمطًا دون إعادة البناء؛ يعيد False إن لم يكن موجودًا."""
+        pid = self._index.get(term)
+        if pid is not None and pid not in self._removed:
+            self._removed = self._removed | {pid}
+            return True
+        if self._delta and term in self._delta._index:
+            items = self._delta.items()
+            del items[term]
+            self._delta = AhoCorasick(items) if items else None
+            return True
+        return False
+
+    def _compact(self, extra: dict):
+        live = {t: self._values[pid] for pid, t in enumerate(self._terms) if pid not in self._removed}
+        live.update(extra)
+        fresh = AhoCorasick(live)
+        # تبديل الحالة دفعة واحدة؛ البحث الجاري يكمل بنسخه المحلية من القوائم القديمة
+        self.__dict__.update(fresh.__dict__)
@@ -0,0 +1,353 @@
+# metrics.py
+# عدّادات ومدرّجات (histogram) خفيفة بصيغة Prometheus النصية، صحيحة مع عدة عمّال gunicorn:
+# مع METRICS_DIR تكتب كل عملية لقطة دورية إلى METRICS_DIR/metrics-<pid>-<start>.json،
+# و /metrics يجمع لقطات كل العمليات. عند بدء كل عامل تُدمج لقطات العمّال المنتهين في
+# metrics-dead.json وتُحذف، فلا تنقص العدّادات (ولا مع إعادة استخدام pid) ولا يكبر المجلد.
+import os
+import json
+import time
+import glob
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # غير متوفر على Windows: تبقى لقطات العمّال المنتهين دون دمج
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+_DEAD = "metrics-dead.json"
+_LOCK = "metrics.lock"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # الأخير = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Registry:
+    """
+    inc(name, n, **labels) للعدّادات، observe(name, seconds, **labels) و timer(name, **labels) للمدرّجات.
+    collect(fn) يسجّل دالة تُقرأ عند كل لقطة وتعيد [(kind, name, labels_dict, value)]
+    (مثل أحجام الطوابير وعدّادات الكاش الموجودة أصلًا في الوحدات الأخرى).
+    """
+
+    def __init__(self, directory: str = None, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._help = {}
+        self._counters = {}       # (name, labels) -> value
+        self._histograms = {}     # (name, labels) -> Histogram
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # العملية الابنة تبدأ من الصفر؛ قيم الأم محفوظة في لقطتها الخاصة
+        self._counters, self._histograms = {}, {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start = None
+
+    # ---------- التسجيل ----------
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def collect(self, fn):
+        self._collectors.append(fn)
+
+    def inc(self, name: str, n: float = 1, **labels):
+        self._ensure_flusher()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name: str, value: float, **labels):
+        self._ensure_flusher()
+        key = (name, tuple(sorted(labels.items())))
+        h = self._histograms.get(key)
+        if h is None:
+            with self._lock:
+                h = self._histograms.setdefault(key, Histogram())
+        h.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # ---------- اللقطات ----------
+    def snapshot(self) -> dict:
+        counters, gauges = [], []
+        with self._lock:
+            for (name, labels), v in self._counters.items():
+                counters.append([name, list(labels), v])
+            hists = list(self._histograms.items())
+        histograms = []
+        for (name, labels), h in hists:
+            with h.lock:
+                histograms.append([name, list(labels), list(h.buckets), list(h.counts), h.sum, h.count])
+        for fn in self._collectors:
+            try:
+                for kind, name, labels, value in fn():
+                    target = counters if kind == "counter" else gauges
+                    target.append([name, sorted(labels.items()), value])
+            except Exception:
+                log.exception("فشل جمع مقياس")
+        return {"pid": os.getpid(), "start": self._start, "time": time.time(), "counters": counters,
+                "gauges": gauges, "histograms": histograms}
+
+    def _name(self):
+        return f"metrics-{self._pid}-{self._start}.json" if self._start else None
+
+    def flush(self):
+        if not self.directory or not self._start:
+            return
+        snap = self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write(os.path.join(self.directory, self._name()), snap)
+        except OSError:
+            log.exception("تعذّر حفظ لقطة المقاييس")
+
+    def _read_dir(self) -> dict:
+        """{اسم الملف: لقطة} لكل اللقطات في المجلد، ومعها metrics-dead.json إن وُجد."""
+        snaps = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            snap = _read(path)
+            if snap is not None:
+                snaps[os.path.basename(path)] = snap
+        return snaps
+
+    def _live(self, snaps: dict) -> set:
+        """أسماء لقطات العمّال الأحياء: pid حي، وأحدث بدء له فقط (pid قد يُعاد استخدامه)."""
+        newest = {}
+        for name, snap in snaps.items():
+            pid = snap.get("pid")
+            if pid == os.getpid():
+                if name == self._name():
+                    newest[pid] = name
+            elif name != _DEAD and _alive(pid):
+                current = newest.get(pid)
+                if current is None or (snap.get("start") or 0) > (snaps[current].get("start") or 0):
+                    newest[pid] = name
+        return set(newest.values())
+
+    @contextmanager
+    def _dir_lock(self, exclusive: bool):
+        """قفل ملف بين العمّال: القراءة مشتركة، والدمج حصري حتى لا يُحسب ملف مرتين."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, _LOCK), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _fold_dead(self):
+        """يدمج لقطات العمّال المنتهين في metrics-dead.json ثم يحذفها."""
+        if fcntl is None:
+            return
+        with self._dir_lock(exclusive=True):
+            snaps = self._read_dir()
+            agg = snaps.pop(_DEAD, None) or {"counters": [], "gauges": [], "histograms": []}
+            # ما دُمج في المرة السابقة ولم يُحذف بعد (توقف بين الكتابة والحذف) محسوب أصلًا
+            for name in agg.get("folded", ()):
+                snaps.pop(name, None)
+                _remove(os.path.join(self.directory, name))
+            live = self._live(snaps)
+            dead = [name for name in snaps if name not in live]
+            if not dead:
+                return
+            counters, _, hists = _merge([agg] + [snaps[name] for name in dead])
+            agg = {
+                "pid": None, "gauges": [], "folded": dead,
+                "counters": [[name, list(labels), v] for (name, labels), v in counters.items()],
+                "histograms": [[name, list(labels), list(buckets), counts, total, count]
+                               for (name, labels, buckets), (counts, total, count) in hists.items()],
+            }
+            # الكتابة أولًا ثم الحذف: القارئ يتجاهل ما في folded حتى يُحذف
+            _write(os.path.join(self.directory, _DEAD), agg)
+            for name in dead:
+                _remove(os.path.join(self.directory, name))
+
+    def _ensure_flusher(self):
+        if self._pid == os.getpid() or not self.directory:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._start = time.time_ns()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        try:
+            self._fold_dead()
+        except (OSError, ValueError, TypeError):
+            log.exception("تعذّر دمج لقطات العمّال المنتهين")
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    # ---------- العرض ----------
+    def _snapshots(self):
+        own = self.snapshot()
+        if not self.directory:
+            return [own]
+        snaps = [own]
+        try:
+            with self._dir_lock(exclusive=False):
+                files = self._read_dir()
+        except OSError:
+            files = {}
+        agg = files.pop(_DEAD, None)
+        folded = set(agg.get("folded", ())) if agg else set()
+        if agg:
+            snaps.append(agg)
+        live = self._live(files)
+        for name, snap in files.items():
+            if name == self._name() or name in folded:
+                continue
+            if name not in live:
+                snap["gauges"] = []   # قيم لحظية لعامل منتهٍ لا معنى لها
+            snaps.append(snap)
+        return snaps
+
+    def render(self) -> str:
+        counters, gauges, hists = _merge(self._snapshots())
+
+        lines, seen = [], set()
+
+        def header(name, default_kind):
+            if name in seen:
+                return
+            seen.add(name)
+            kind, help_text = self._help.get(name, (default_kind, ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), v in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_fmt_labels(labels)} {_num(v)}")
+        for (name, labels), v in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_fmt_labels(labels)} {_num(v)}")
+        for (name, labels, buckets), (counts, total, count) in sorted(hists.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for le, c in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _num(le)),))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_num(total)}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(snaps):
+    """يجمع لقطات عدة عمليات: ({(name, labels): v} للعدّادات والقيم اللحظية، {(name, labels, buckets): [counts, sum, count]})."""
+    counters, gauges, hists = {}, {}, {}
+    for snap in snaps:
+        for name, labels, v in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + v
+        for name, labels, v in snap["gauges"]:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + v
+        for name, labels, buckets, counts, total, count in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)), tuple(buckets))
+            agg = hists.setdefault(key, [[0] * len(counts), 0.0, 0])
+            agg[0] = [a + b for a, b in zip(agg[0], counts)]
+            agg[1] += total
+            agg[2] += count
+    return counters, gauges, hists
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path: str, data: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _alive(pid) -> bool:
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _num(v) -> str:
+    if isinstance(v, str):
+        return v
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+# السجل العام للتطبيق: METRICS_DIR (مجلد مشترك بين العمّال) و METRICS_FLUSH_INTERVAL بالثواني
+registry = Registry(
+    directory=os.getenv("METRICS_DIR") or None,
+    flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", "5")),
+)
+registry.describe("linebot_stage_seconds", "histogram", "Time spent per webhook pipeline stage.")
+registry.describe("linebot_errors_total", "counter", "Errors per webhook pipeline stage.")
+registry.describe("linebot_reloads_total", "counter", "Config reloads (matcher rebuilds) per kind.")
+registry.describe("linebot_events_total", "counter", "Webhook events received per type.")
+registry.describe("linebot_replies_total", "counter", "Outbound replies by final outcome (success/dropped).")
+registry.describe("linebot_reply_retries_total", "counter", "Outbound reply retries per reason (429/5xx/network).")
+registry.describe("linebot_reply_drops_total", "counter", "Dropped outbound replies per reason.")
+registry.describe("linebot_shed_total", "counter", "Events shed by admission control (before any outbound call) per priority.")
@@ -0,0 +1,52 @@
+# normalize.py
+# تطبيع النص العربي بقواعد واحدة يستخدمها helper.py و app.py
+from functools import lru_cache
+
+# التشكيل وعلامات القرآن والتطويل تُحذف
+_REMOVE = (
+    [chr(c) for c in range(0x0610, 0x061B)]
+    + [chr(c) for c in range(0x064B, 0x0660)]
+    + ["ٰ", "ـ"]
+    + [chr(c) for c in range(0x06D6, 0x06EE)]
+)
+
+# توحيد الحروف المتقاربة
+_MAP = {
+    "أ": "ا", "إ": "ا", "آ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+}
+
+# جدول واحد لـ str.translate: كل القواعد في مرور واحد بدل عدة replace
+_TABLE = str.maketrans({**{ch: None for ch in _REMOVE}, **_MAP})
+
+# الرسائل القصيرة المتكررة (تحيات، شكرًا، ".") تُخزّن نتائجها
+_CACHE_MAX_LEN = 64
+
+
+def translate_ar(text: str) -> str:
+    """الحذف والتوحيد فقط، دون lower ودون مسافات (يصلح لأنماط regex)."""
+    return text.translate(_TABLE) if text else ""
+
+
+@lru_cache(maxsize=4096)
+def _normalize_cached(text: str, collapse_ws: bool) -> str:
+    return _normalize(text, collapse_ws)
+
+
+def _normalize(text: str, collapse_ws: bool) -> str:
+    t = text.translate(_TABLE).lower()
+    return " ".join(t.split()) if collapse_ws else t.strip()
+
+
+def normalize_ar(text: str, collapse_ws: bool = True) -> str:
+    """
+    يحذف التشكيل والتطويل، يوحّد (أ إ آ ← ا، ى ئ ← ي، ؤ ← و، ة ← ه)، يحوّل لأحرف صغيرة،
+    ويطوي المسافات المتتالية إلى مسافة واحدة (collapse_ws=False يكتفي بقص الأطراف).
+    """
+    if not text:
+        return ""
+    if len(text) <= _CACHE_MAX_LEN:
+        return _normalize_cached(text, collapse_ws)
+    return _normalize(text, collapse_ws)
@@ -0,0 +1,53 @@
+# ratelimit.py
+# Token bucket لكل مصدر (قروب/غرفة/مستخدم) مع ذاكرة محدودة
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    take(key) تعيد (allowed, suppressed):
+      - allowed: هل يُسمح بالإرسال الآن
+      - suppressed: عدد المحاولات التي مُنعت لهذا المصدر منذ آخر سماح (للدمج في رسالة واحدة)
+    المصادر الأقل استخدامًا تُحذف أولًا عند تجاوز max_keys، فالذاكرة ثابتة مهما زاد عدد القروبات.
+    per_minute <= 0 يعني بلا حد.
+    """
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = 10_000):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()   # key -> [tokens, last, suppressed]
+        self.configure(per_minute, burst, max_keys)
+
+    def configure(self, per_minute: float, burst: float, max_keys: int = 10_000):
+        """تحديث الحدود عند إعادة تحميل الإعداد مع الإبقاء على الحالة الحالية."""
+        with self._lock:
+            self.rate = max(0.0, float(per_minute)) / 60.0
+            self.burst = max(1.0, float(burst))
+            self.max_keys = max(1, int(max_keys))
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key):
+        if self.rate <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = [self.burst, now, 0]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+                b[1] = now
+            if b[0] >= 1.0:
+                b[0] -= 1.0
+                suppressed, b[2] = b[2], 0
+                return True, suppressed
+            b[2] += 1
+            return False, b[2]
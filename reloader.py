@@ -0,0 +1,184 @@
+# reloader.py
+# مراقبة ملفات الإعداد في الخلفية (inotify إن توفر، وإلا فحص دوري)
+# حتى لا يحتاج مسار الرسائل إلى stat مع كل رسالة.
+import os
+import time
+import struct
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# ثوابت inotify من <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_CLOEXEC = 0o2000000
+_IN_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+            | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _load_inotify():
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch  # يتأكد من وجود الدوال
+        return libc
+    except Exception:
+        return None
+
+
+class FileWatcher:
+    """
+    version(path) تعيد عدّادًا يزيد كلما تغيّر الملف، وقراءته لا تلمس القرص.
+    - mode="auto": inotify على مجلد الملف إن أمكن، وإلا فحص دوري كل poll_interval ثانية.
+    - mode="poll": فحص دوري فقط.
+    الخيط يُشغَّل داخل كل عملية عند أول استخدام (آمن مع fork في gunicorn).
+    """
+
+    def __init__(self, mode: str = "auto", poll_interval: float = 2.0):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._paths = {}      # abspath -> [version, signature]
+        self._pid = None
+        self._libc = None
+        self._fd = None
+        self._wds = {}        # wd -> مجلد
+        self._dirs = {}       # مجلد -> wd
+        self._polling = False
+        if hasattr(os, "register_at_fork"):
+            # خيط المراقبة في الأم (مثلًا مع التحميل المسبق) قد يكون ممسكًا بالقفل لحظة fork
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def version(self, path: str) -> int:
+        if self._pid != os.getpid():
+            self._start()
+        entry = self._paths.get(os.path.abspath(path))
+        if entry is None:
+            entry = self._watch(os.path.abspath(path))
+        return entry[0]
+
+    def notify(self, path: str):
+        """لمن يكتب الملف داخل نفس العملية: يُعلِم بالتغيير فورًا دون انتظار المراقب."""
+        self._check(os.path.abspath(path), force=True)
+
+    # ---------- داخلي ----------
+    def _watch(self, path: str):
+        with self._lock:
+            entry = self._paths.get(path)
+            if entry is None:
+                entry = self._paths[path] = [1, _signature(path)]
+                if self._fd is not None:
+                    self._add_dir(os.path.dirname(path))
+        return entry
+
+    def _check(self, path: str, force: bool = False):
+        with self._lock:
+            entry = self._paths.get(path)
+            if entry is None:
+                self._paths[path] = [1, _signature(path)]
+                return
+            sig = _signature(path)
+            if force or sig != entry[1]:
+                entry[0] += 1
+                entry[1] = sig
+
+    def _check_all(self):
+        for path in list(self._paths):
+            self._check(path)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._fd is not None:
+                # وصف inotify موروث من العملية الأم بلا خيط يقرؤه
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+            self._fd, self._wds, self._dirs, self._polling = None, {}, {}, False
+            if self.mode == "auto":
+                self._libc = self._libc or _load_inotify()
+                if self._libc is not None:
+                    fd = self._libc.inotify_init1(_IN_CLOEXEC)
+                    self._fd = fd if fd >= 0 else None
+            for path in self._paths:
+                if self._fd is not None:
+                    self._add_dir(os.path.dirname(path))
+            if self._fd is not None:
+                threading.Thread(target=self._inotify_loop, name="config-watcher", daemon=True).start()
+            else:
+                self._start_polling()
+            self._pid = os.getpid()
+        # أي تغيير حصل قبل بدء المراقبة (مثلًا بين التحميل المسبق و fork)
+        self._check_all()
+
+    def _add_dir(self, directory: str):
+        directory = directory or "."
+        if directory in self._dirs:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_MASK)
+        if wd < 0:
+            log.warning("تعذّر مراقبة %s عبر inotify، سيُعتمد الفحص الدوري", directory)
+            self._dirs[directory] = None
+            self._start_polling()
+            return
+        self._dirs[directory] = wd
+        self._wds[wd] = directory
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            threading.Thread(target=self._poll_loop, name="config-poller", daemon=True).start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self._check_all()
+
+    def _inotify_loop(self):
+        fd = self._fd
+        while True:
+            try:
+                buf = os.read(fd, 64 * 1024)
+            except OSError:
+                log.exception("توقف inotify، التحويل إلى الفحص الدوري")
+                with self._lock:
+                    self._start_polling()
+                return
+            changed = set()
+            pos = 0
+            while pos + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, pos)
+                pos += _EVENT_HEADER.size
+                name = buf[pos:pos + length].rstrip(b"\0")
+                pos += length
+                if mask & _IN_Q_OVERFLOW:
+                    changed.update(self._paths)
+                    continue
+                directory = self._wds.get(wd)
+                if directory is not None:
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+            for path in changed:
+                if path in self._paths:
+                    self._check(path)
@@ -0,0 +1,118 @@
+# replies.py
+# محرك الردود المُجمّع: exact -> contains -> regex -> fallback
+import re
+from collections import namedtuple
+
+from matcher import AhoCorasick
+
+# text: نص الرد، strategy: الاستراتيجية التي طابقت، key: المفتاح/النمط المطابق
+Reply = namedtuple("Reply", "text strategy key")
+
+# قواعد لا يصح دمجها في التعبير الموحّد (مراجع خلفية، مجموعات مسمّاة، أو أعلام عامة مثل (?i)
+# لا تُقبل إلا في بداية التعبير كله)
+_UNMERGEABLE = re.compile(r"\\[1-9]|\\g<|\(\?P[<=]|\(\?[aiLmsux]+\)")
+
+# النص يصل بأحرف صغيرة بعد التطبيع، فالأنماط تُجمّع دون حساسية لحالة الأحرف
+# (وإلا لا يطابق نمط فيه حرف لاتيني كبير أبدًا)
+_FLAGS = re.IGNORECASE
+
+
+def _compile_regex(rules: dict):
+    """
+    يدمج كل القواعد في تعبير واحد بمجموعات مسمّاة (r0|r1|...) حتى يكفي بحث واحد.
+    القواعد غير الصالحة تُتجاهل، وغير القابلة للدمج تُفحص منفردة بعد التعبير الموحّد.
+    إن فشل تجميع التعبير الموحّد لأي سبب تُفحص كل القواعد منفردة بترتيب الملف.
+    """
+    merged, names, single, compiled_rules = [], {}, [], []
+    for pattern, reply in rules.items():
+        try:
+            compiled = re.compile(pattern, _FLAGS)
+        except re.error:
+            continue
+        compiled_rules.append((compiled, pattern, reply))
+        if _UNMERGEABLE.search(pattern):
+            single.append((compiled, pattern, reply))
+            continue
+        name = f"r{len(names)}"
+        names[name] = (pattern, reply)
+        merged.append(f"(?P<{name}>{pattern})")
+    if not merged:
+        return None, names, single
+    try:
+        return re.compile("|".join(merged), _FLAGS), names, single
+    except re.error:
+        return None, {}, compiled_rules
+
+
+class ReplyEngine:
+    """
+    يُبنى مرة واحدة عند إعادة تحميل الملفات، والمطابقة بترتيب ثابت:
+      1) exact    : بحث في قاموس (hash)
+      2) contains : مرور واحد بآلة Aho-Corasick (الأقرب في الرسالة يفوز)
+      3) regex    : بحث واحد بالتعبير الموحّد (الأسبق في الرسالة، ثم ترتيب الملف)
+      4) fallback : رد افتراضي إن وُجد
+    المفاتيح والنص يُمرَّران بعد التطبيع؛ أنماط regex تُطبّق على النص المُطبّع.
+    """
+
+    def __init__(self, exact=None, contains=None, regex=None, fallback=None):
+        self.exact = dict(exact or {})
+        self.contains = AhoCorasick(contains or {})
+        self._regex, self._regex_names, self._regex_single = _compile_regex(regex or {})
+        self.fallback = fallback
+
+    def match(self, text: str, use_fallback: bool = True):
+        """يعيد Reply أو None."""
+        reply = self.exact.get(text)
+        if reply is not None:
+            return Reply(reply, "exact", text)
+
+        hit = self.contains.find(text)
+        if hit:
+            return Reply(hit.value, "contains", hit.term)
+
+        if self._regex is not None:
+            m = self._regex.search(text)
+            if m:
+                pattern, reply = self._regex_names[m.lastgroup]
+                return Reply(reply, "regex", pattern)
+        for compiled, pattern, reply in self._regex_single:
+            if compiled.search(text):
+                return Reply(reply, "regex", pattern)
+
+        if use_fallback and self.fallback:
+            return Reply(self.fallback, "fallback", None)
+        return None
+
+    def update(self, strategy: str, key: str, reply):
+        """تعديل مفتاح واحد في المحرك الحي (exact أو contains)؛ reply=None للحذف."""
+        if strategy == "exact":
+            if reply is None:
+                self.exact.pop(key, None)
+            else:
+                self.exact[key] = reply
+        elif strategy == "contains":
+            if reply is None:
+                self.contains.remove(key)
+            else:
+                self.contains.insert(key, reply)
+        else:
+            raise ValueError(f"strategy غير مدعومة للتعديل الحي: {strategy}")
+
+
+class OverlayEngine:
+    """
+    قواعد قروب/غرفة فوق المحرك العام: قواعد القروب (exact ثم contains ثم regex) أولًا،
+    ثم المحرك العام، ثم fallback القروب إن وُجد وإلا fallback العام.
+    لا تُنسخ القواعد العامة داخل كل قروب، فيبقى حجم كل قروب بحجم قواعده فقط.
+    """
+
+    def __init__(self, overlay: ReplyEngine, base: ReplyEngine):
+        self.overlay = overlay
+        self.base = base
+
+    def match(self, text: str, use_fallback: bool = True):
+        hit = self.overlay.match(text, use_fallback=False) or self.base.match(text, use_fallback=False)
+        if hit or not use_fallback:
+            return hit
+        fallback = self.overlay.fallback or self.base.fallback
+        return Reply(fallback, "fallback", None) if fallback else None
@@ -0,0 +1,67 @@
+# search.py
+# فهرس بحث للوحة الإدارة فوق المفاتيح بعد التطبيع:
+#   - بحث بالبادئة: مصفوفة مرتبة + bisect
+#   - بحث بالاحتواء: فهرس ثنائيات الأحرف (bigrams)، ثم تحقق نهائي على المرشّحين فقط؛
+#     والاستعلام بحرف واحد من فهرس الأحرف المفردة مباشرة
+# يُبنى مرة لكل مراجعة من البيانات، وكل صفحة تكلف حجمها لا حجم القائمة.
+from bisect import bisect_left
+
+from normalize import normalize_ar
+
+
+class KeyIndex:
+    """
+    KeyIndex(items) حيث items قاموس (مفتاح -> قيمة) أو قائمة مفاتيح.
+    search(query, offset, limit, mode) يعيد (العدد الكلي، [(مفتاح، قيمة)]) بترتيب الإدخال
+    للاحتواء وبالترتيب الأبجدي للبادئة.
+    """
+
+    def __init__(self, items):
+        if isinstance(items, dict):
+            self._keys, self._values = list(items), list(items.values())
+        else:
+            self._keys, self._values = list(items), None
+        self._norm = [normalize_ar(k) for k in self._keys]
+        self._order = sorted(range(len(self._keys)), key=self._norm.__getitem__)
+        self._sorted = [self._norm[i] for i in self._order]
+        self._chars = {}
+        self._bigrams = {}
+        for i, k in enumerate(self._norm):
+            for c in set(k):
+                self._chars.setdefault(c, []).append(i)
+            for g in {k[j:j + 2] for j in range(len(k) - 1)}:
+                self._bigrams.setdefault(g, []).append(i)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _rows(self, ids):
+        values = self._values
+        return [(self._keys[i], values[i] if values is not None else None) for i in ids]
+
+    def search(self, query: str = "", offset: int = 0, limit: int = 50, mode: str = "contains"):
+        q = normalize_ar(query or "")
+        offset, limit = max(0, offset), max(1, limit)
+        if not q:
+            return len(self._keys), self._rows(range(offset, min(len(self._keys), offset + limit)))
+        if mode == "prefix":
+            lo = bisect_left(self._sorted, q)
+            hi = bisect_left(self._sorted, q + "\U0010ffff")
+            return hi - lo, self._rows(self._order[lo + offset:min(hi, lo + offset + limit)])
+        ids = self._candidates(q)
+        return len(ids), self._rows(ids[offset:offset + limit])
+
+    def _candidates(self, q: str) -> list:
+        if len(q) < 2:
+            return self._chars.get(q, [])
+        grams = {q[j:j + 2] for j in range(len(q) - 1)}
+        postings = sorted((self._bigrams.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        ids = set(postings[0])
+        for p in postings[1:]:
+            ids.intersection_update(p)
+            if not ids:
+                return []
+        norm = self._norm
+        return sorted(i for i in ids if q in norm[i])
@@ -0,0 +1,71 @@
+# snapshot.py
+# لقطة مُجمّعة على القرص لمحركات المطابقة (الردود والمنع) بجانب ملف الكلمات،
+# حتى لا يعيد كل عامل جديد قراءة الملفات وتطبيعها وبناء آلات Aho-Corasick.
+# الملف = مفتاح المصدر (توقيعات الملفات/رقم مراجعة القاعدة) ثم المحتوى، كلاهما pickle:
+# يُقرأ المفتاح أولًا، ولا يُفك المحتوى إلا إذا طابق المصدر الحالي.
+import os
+import sys
+import pickle
+import logging
+
+log = logging.getLogger(__name__)
+
+# يُرفع عند تغيير شكل المحتوى أو قواعد التطبيع حتى تُهمل اللقطات القديمة
+FORMAT = 7
+
+
+def file_key(path: str):
+    """توقيع الملف (الحجم ووقت التعديل والـ inode)، أو None إن لم يوجد."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class SnapshotStore:
+    """
+    load(name, key) يعيد المحتوى المحفوظ إن كان مفتاحه يساوي key، وإلا None.
+    save(name, key, payload) يكتب اللقطة بشكل ذرّي (ملف مؤقت ثم replace).
+    directory=None يعطّل اللقطات.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.snapshot")
+
+    def _key(self, key):
+        return (FORMAT, sys.version_info[:2], key)
+
+    def load(self, name: str, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(name), "rb") as f:
+                if pickle.load(f) != self._key(key):
+                    return None
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            log.warning("تجاهل لقطة تالفة %s", self._path(name), exc_info=True)
+            return None
+
+    def save(self, name: str, key, payload):
+        if not self.directory:
+            return
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(self._key(key), f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            log.warning("تعذّر حفظ اللقطة %s", path, exc_info=True)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,293 @@
+# store.py
+# تخزين الكلمات وقائمة المنع في SQLite (وضع WAL) مشترك بين عمّال gunicorn
+import os
+import json
+import time
+import sqlite3
+import threading
+import itertools
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    key   TEXT PRIMARY KEY,
+    reply TEXT NOT NULL,
+    rev   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS forbidden (
+    term TEXT PRIMARY KEY,
+    rev  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    rev   INTEGER PRIMARY KEY,
+    kind  TEXT NOT NULL,
+    op    TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    value TEXT
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('revision', 0), ('words', 0), ('forbidden', 0);
+-- قاعدة أقدم من سجل التغييرات: لا إعادة تشغيل لما قبل المراجعة الحالية
+INSERT OR IGNORE INTO meta (name, value) SELECT 'pruned', value FROM meta WHERE name='revision';
+"""
+
+
+class KeywordStore:
+    """
+    كل تعديل صف واحد داخل معاملة، ويرفع رقم المراجعة (revision) بمقدار 1.
+    revision() للتغيير في أي شيء، و revision("words") / revision("forbidden")
+    لرقم آخر مراجعة غيّرت ذلك النوع فقط؛ الأرقام لا تنقص أبدًا.
+    كل تعديل يُسجّل أيضًا في جدول changes (سجل مرقّم بالمراجعة) حتى تطبّق العمّال الأخرى
+    الفرق وحده عبر changes_since() بدل إعادة قراءة كل شيء؛ يُحتفظ بآخر log_size تغيير.
+    مع revision_ttl > 0 تُقرأ أرقام المراجعة من نسخة في الذاكرة تتجدد مرة كل revision_ttl ثانية
+    على الأكثر (استعلام واحد لكل الأنواع)، وأي كتابة من هذه العملية تُسقطها فورًا؛
+    فلا يكلّف فحص التغيير مع كل رسالة استعلامًا على القاعدة.
+    اتصال لكل خيط ولكل عملية (لا يُشارك اتصال بعد fork).
+    """
+
+    def __init__(self, path: str, log_size: int = 10_000, revision_ttl: float = 0.0):
+        self.path = path
+        self.log_size = max(1, log_size)
+        self.revision_ttl = revision_ttl
+        self._local = threading.local()
+        self._gens = itertools.count()
+        self._gen = next(self._gens)
+        self._revs = None     # (وقت القراءة، الجيل، {name: value})
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _write(self, kind: str, sql: str, params: dict, op: str, key: str, value=None) -> bool:
+        """ينفّذ تعديلًا واحدًا؛ يرفع المراجعة ويسجّل التغيير فقط إن تغيّر صف فعلًا."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rev = conn.execute("SELECT value FROM meta WHERE name='revision'").fetchone()[0] + 1
+            changed = conn.execute(sql, {**params, "rev": rev}).rowcount > 0
+            if changed:
+                conn.execute("UPDATE meta SET value=? WHERE name IN ('revision', ?)", (rev, kind))
+                conn.execute(
+                    "INSERT INTO changes (rev, kind, op, key, value) VALUES (?, ?, ?, ?, ?)",
+                    (rev, kind, op, key, value),
+                )
+                if rev % 100 == 0:
+                    self._prune(conn, rev - self.log_size)
+            conn.execute("COMMIT")
+            return changed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._changed()
+
+    def _changed(self):
+        # جيل جديد يُبطل أرقام المراجعة المخزّنة، حتى ما قُرئ منها أثناء هذه الكتابة
+        self._gen = next(self._gens)
+
+    # ---------- المراجعة ----------
+    def revision(self, kind: str = "revision", fresh: bool = False) -> int:
+        """fresh=True يقرأ القاعدة مباشرة (مثلًا لـ ETag في لوحة الإدارة)."""
+        if fresh or self.revision_ttl <= 0:
+            row = self._conn().execute("SELECT value FROM meta WHERE name=?", (kind,)).fetchone()
+            return row[0] if row else 0
+        now = time.monotonic()
+        cached = self._revs
+        if cached is None or cached[1] != self._gen or now - cached[0] >= self.revision_ttl:
+            gen = self._gen
+            cached = self._revs = (now, gen, dict(self._conn().execute("SELECT name, value FROM meta")))
+        return cached[2].get(kind, 0)
+
+    # ---------- سجل التغييرات ----------
+    def _prune(self, conn, upto: int):
+        if upto > 0:
+            conn.execute("DELETE FROM changes WHERE rev <= ?", (upto,))
+            conn.execute("UPDATE meta SET value=max(value, ?) WHERE name='pruned'", (upto,))
+
+    def changes_since(self, kind: str, since: int):
+        """
+        [(rev, op, key, value)] لتغييرات kind بعد المراجعة since بالترتيب،
+        أو None إن حُذف جزء منها من السجل (يلزم عندها إعادة تحميل كاملة).
+        """
+        conn = self._conn()
+        pruned = conn.execute("SELECT value FROM meta WHERE name='pruned'").fetchone()
+        if since < (pruned[0] if pruned else 0):
+            return None
+        return conn.execute(
+            "SELECT rev, op, key, value FROM changes WHERE kind=? AND rev > ? ORDER BY rev",
+            (kind, since),
+        ).fetchall()
+
+    def recent_changes(self, limit: int = 20) -> list:
+        """[(rev, kind, op, key, value)] الأحدث أولًا (للوحة الإدارة)."""
+        return self._conn().execute(
+            "SELECT rev, kind, op, key, value FROM changes ORDER BY rev DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    # ---------- الكلمات ----------
+    def words(self) -> dict:
+        rows = self._conn().execute("SELECT key, reply FROM words ORDER BY rowid")
+        return {k: v for k, v in rows}
+
+    def upsert_word(self, key: str, reply: str) -> bool:
+        return self._write(
+            "words",
+            "INSERT INTO words (key, reply, rev) VALUES (:key, :reply, :rev) "
+            "ON CONFLICT(key) DO UPDATE SET reply=excluded.reply, rev=excluded.rev "
+            "WHERE words.reply IS NOT excluded.reply",
+            {"key": key, "reply": reply},
+            "upsert", key, reply,
+        )
+
+    def delete_word(self, key: str) -> bool:
+        return self._write("words", "DELETE FROM words WHERE key=:key", {"key": key}, "delete", key)
+
+    # ---------- قائمة المنع ----------
+    def forbidden(self) -> list:
+        return [t for (t,) in self._conn().execute("SELECT term FROM forbidden ORDER BY rowid")]
+
+    def add_forbidden(self, term: str) -> bool:
+        return self._write("forbidden", "INSERT OR IGNORE INTO forbidden (term, rev) VALUES (:term, :rev)",
+                           {"term": term}, "upsert", term)
+
+    def remove_forbidden(self, term: str) -> bool:
+        return self._write("forbidden", "DELETE FROM forbidden WHERE term=:term", {"term": term}, "delete", term)
+
+    # ---------- الاستيراد والتصدير الجماعي ----------
+    def iter_rows(self, kind: str):
+        """مؤشر كسول على صفوف النوع ((key, reply) أو (term,)) للتصدير دون تحميل الجدول كله."""
+        if kind == "words":
+            return self._conn().execute("SELECT key, reply FROM words ORDER BY rowid")
+        return self._conn().execute("SELECT term FROM forbidden ORDER BY rowid")
+
+    def bulk_import(self, kind: str, batches, replace: bool = False) -> int:
+        """
+        يكتب كل الدفعات في معاملة واحدة ومراجعة واحدة (إما كلها أو لا شيء)، ويعيد عدد المدخلات
+        التي أُضيفت أو تغيّرت أو حُذفت فعلًا. الدفعات تُقرأ أولًا إلى جدول مؤقت خاص بالاتصال
+        (ذاكرة ثابتة، ودون قفل الكتابة على القاعدة مهما بطؤ الرفع)، ثم تُطبّق في معاملة قصيرة.
+        لا تُسجّل الصفوف فرادى في changes: يُرفع 'pruned' إلى المراجعة الجديدة
+        فيعيد كل عامل التحميل كاملًا مرة واحدة، ويُسجّل سطر ملخص واحد للوحة الإدارة.
+        replace=True يجعل المحتوى مطابقًا للملف (بترتيبه).
+        """
+        conn = self._conn()
+        if kind == "words":
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_words (key TEXT PRIMARY KEY, reply TEXT NOT NULL)")
+            stage = ("INSERT INTO temp.import_words (key, reply) VALUES (?, ?) "
+                     "ON CONFLICT(key) DO UPDATE SET reply=excluded.reply")
+            differs = ("SELECT count(*) FROM temp.import_words AS i LEFT JOIN words AS w ON w.key = i.key "
+                       "WHERE w.reply IS NOT i.reply")
+            missing = "SELECT count(*) FROM words WHERE key NOT IN (SELECT key FROM temp.import_words)"
+            upsert = ("INSERT INTO words (key, reply, rev) SELECT key, reply, ? FROM temp.import_words "
+                      "WHERE true ORDER BY rowid "
+                      "ON CONFLICT(key) DO UPDATE SET reply=excluded.reply, rev=excluded.rev "
+                      "WHERE words.reply IS NOT excluded.reply")
+        else:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_forbidden (term TEXT PRIMARY KEY)")
+            stage = "INSERT OR IGNORE INTO temp.import_forbidden (term) VALUES (?)"
+            differs = "SELECT count(*) FROM temp.import_forbidden WHERE term NOT IN (SELECT term FROM forbidden)"
+            missing = "SELECT count(*) FROM forbidden WHERE term NOT IN (SELECT term FROM temp.import_forbidden)"
+            upsert = "INSERT OR IGNORE INTO forbidden (term, rev) SELECT term, ? FROM temp.import_forbidden ORDER BY rowid"
+        staging = f"temp.import_{kind}"
+        try:
+            conn.execute(f"DELETE FROM {staging}")
+            for batch in batches:
+                conn.execute("BEGIN")
+                conn.executemany(stage, batch)
+                conn.execute("COMMIT")
+            conn.execute("BEGIN IMMEDIATE")
+            rev = conn.execute("SELECT value FROM meta WHERE name='revision'").fetchone()[0] + 1
+            if replace:
+                # حذف الكل ثم الإدراج بترتيب الملف، مع عدّ ما اختلف فعلًا فقط
+                changed = (conn.execute(differs).fetchone()[0]
+                           + conn.execute(missing).fetchone()[0])
+                if changed:
+                    conn.execute(f"DELETE FROM {kind}")
+                    conn.execute(upsert, (rev,))
+            else:
+                before = conn.total_changes
+                conn.execute(upsert, (rev,))
+                changed = conn.total_changes - before
+            if changed:
+                conn.execute("UPDATE meta SET value=? WHERE name IN ('revision', 'pruned', ?)", (rev, kind))
+                conn.execute(
+                    "INSERT INTO changes (rev, kind, op, key, value) VALUES (?, ?, ?, ?, NULL)",
+                    (rev, kind, "replace" if replace else "import", str(changed)),
+                )
+            conn.execute("COMMIT")
+            return changed
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.execute(f"DELETE FROM {staging}")
+            self._changed()
+
+    # ---------- الاستيراد الأولي ----------
+    def import_json(self, words_path: str = None, moderation_path: str = None) -> bool:
+        """
+        استيراد لمرة واحدة من words.json و moderation.json إلى قاعدة فارغة.
+        يعيد True إن تم الاستيراد الآن، و False إن سبق الاستيراد.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE name='imported'").fetchone():
+                conn.execute("COMMIT")
+                return False
+            rev = conn.execute("SELECT value FROM meta WHERE name='revision'").fetchone()[0] + 1
+            words = _read_json(words_path)
+            if isinstance(words, dict):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO words (key, reply, rev) VALUES (?, ?, ?)",
+                    [(k, v, rev) for k, v in words.items() if isinstance(k, str) and isinstance(v, str)],
+                )
+            mod = _read_json(moderation_path)
+            if isinstance(mod, dict):
+                conn.executemany(
+                    "INSERT OR IGNORE INTO forbidden (term, rev) VALUES (?, ?)",
+                    [(t, rev) for t in mod.get("forbidden", []) if isinstance(t, str)],
+                )
+            conn.execute("UPDATE meta SET value=? WHERE name IN ('revision', 'words', 'forbidden', 'pruned')", (rev,))
+            conn.execute("INSERT INTO meta (name, value) VALUES ('imported', ?)", (rev,))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._changed()
+
+
+def _read_json(path):
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def store_from_env(words_path: str, moderation_path: str):
+    """
+    STORE_BACKEND=sqlite يفعّل التخزين في SQLite (STORE_FILE، افتراضيًا bot.db بجانب ملف الكلمات).
+    أرقام المراجعة تُعاد قراءتها كل CONFIG_POLL_INTERVAL ثانية على الأكثر، كمراقبة الملفات.
+    يعيد None مع الإعداد الافتراضي (ملفات JSON).
+    """
+    if os.getenv("STORE_BACKEND", "json").lower() != "sqlite":
+        return None
+    path = os.getenv("STORE_FILE") or os.path.join(os.path.dirname(words_path) or ".", "bot.db")
+    store = KeywordStore(path, log_size=int(os.getenv("STORE_CHANGE_LOG", "10000")),
+                         revision_ttl=float(os.getenv("CONFIG_POLL_INTERVAL", "2")))
+    store.import_json(words_path, moderation_path)
+    return store
@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+import importlib
+
+import pytest
+
+# الوحدات في جذر الريبو (بلا حزمة)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def load_helper(tmp_path, monkeypatch):
+    """
+    يعيد دالة تستورد helper من جديد على ملفات مؤقتة (SQLite، دون لقطات أو مراقب inotify)؛
+    المتغيرات الممرّرة تتقدّم على الافتراضية، مثل load_helper(REPLY_CACHE_SIZE="64").
+    """
+    (tmp_path / "words.json").write_text(json.dumps({"مرحبا": "هلا والله!", "بوت": "أنا هنا"}, ensure_ascii=False),
+                                         encoding="utf-8")
+    (tmp_path / "moderation.json").write_text(json.dumps({"forbidden": ["شتيمة"]}, ensure_ascii=False),
+                                              encoding="utf-8")
+
+    def load(**overrides):
+        env = {
+            "STORE_BACKEND": "sqlite", "STORE_FILE": str(tmp_path / "bot.db"),
+            "WORDS_FILE": str(tmp_path / "words.json"), "MODERATION_FILE": str(tmp_path / "moderation.json"),
+            "REPLIES_FILE": str(tmp_path / "replies.json"), "GROUPS_FILE": str(tmp_path / "groups.json"),
+            "BLOCKLIST_FILE": str(tmp_path / "blocklist.txt"),
+            "MATCHER_SNAPSHOT": "0", "ANALYTICS_FILE": "", "CONFIG_WATCH": "poll", "REPLY_CACHE_SIZE": "0",
+        }
+        env.update(overrides)
+        for k, v in env.items():
+            monkeypatch.setenv(k, v)
+        sys.modules.pop("helper", None)
+        return importlib.import_module("helper")
+
+    yield load
+    sys.modules.pop("helper", None)
@@ -0,0 +1,55 @@
+import time
+import threading
+
+from admission import AdmissionController, MODERATION, WELCOME, AUTO_REPLY, RANK
+from worker import EventQueue
+
+
+def test_load_budget_sheds_low_priority_first():
+    backlog = [0]
+    a = AdmissionController(10, max_lag=0, backlog=lambda: backlog[0])
+    backlog[0] = 4
+    assert a.admit(AUTO_REPLY) and a.admit(WELCOME) and a.admit(MODERATION)
+    backlog[0] = 6
+    assert not a.admit(AUTO_REPLY)
+    assert a.admit(WELCOME) and a.admit(MODERATION)
+    backlog[0] = 9
+    assert not a.admit(WELCOME) and a.admit(MODERATION)
+    backlog[0] = 10
+    assert not a.admit(MODERATION)
+    assert a.shed == {MODERATION: 1, WELCOME: 1, AUTO_REPLY: 1}
+
+
+def test_lag_budget_applies_without_queue():
+    a = AdmissionController(0, max_lag=20)
+    ts = (time.time() - 12) * 1000
+    assert not a.admit(AUTO_REPLY, ts)
+    assert a.admit(WELCOME, ts) and a.admit(MODERATION, ts)
+    assert a.admit(AUTO_REPLY, time.time() * 1000)
+    assert a.admit(AUTO_REPLY, None)
+
+
+def test_handling_counts_towards_load():
+    a = AdmissionController(2, max_lag=0)
+    with a.handling():
+        assert a.load() == 1
+        assert not a.admit(AUTO_REPLY)
+        assert a.admit(MODERATION)
+    assert a.load() == 0
+
+
+def test_event_queue_runs_higher_priority_first():
+    seen, gate = [], threading.Event()
+
+    def handle(item):
+        gate.wait()
+        seen.append(item)
+
+    q = EventQueue(handle, workers=1)
+    q.submit("first", RANK[AUTO_REPLY])   # يشغل الخيط الوحيد حتى يُفتح gate
+    time.sleep(0.05)
+    for item, priority in (("reply", AUTO_REPLY), ("welcome", WELCOME), ("warn", MODERATION)):
+        q.submit(item, RANK[priority])
+    gate.set()
+    q._queue.join()
+    assert seen == ["first", "warn", "welcome", "reply"]
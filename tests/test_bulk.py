@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+from bulk import ImportReport, BulkImportError, guess_format, parse_batches, format_rows
+
+
+def parse(data, fmt, kind, strict=False):
+    report = ImportReport()
+    rows = [row for batch in parse_batches(io.BytesIO(data.encode("utf-8")), fmt, kind, report, strict) for row in batch]
+    return rows, report
+
+
+def test_jsonl_rows_and_per_line_errors():
+    data = '{"key": "مرحبا", "reply": "هلا"}\n\n{"key": ""}\nnot json\n["بوت", "أنا هنا"]\n'
+    rows, report = parse(data, "jsonl", "words")
+    assert rows == [("مرحبا", "هلا"), ("بوت", "أنا هنا")]
+    assert [line for line, _ in report.errors] == [3, 4]
+
+
+def test_forbidden_empty_list_is_a_row_error():
+    rows, report = parse('[]\n"شتيمة"\n{"term": "كلمة"}\n', "jsonl", "forbidden")
+    assert rows == [("شتيمة",), ("كلمة",)]
+    assert [line for line, _ in report.errors] == [1]
+
+
+def test_csv_header_is_skipped():
+    rows, report = parse("\ufeffkey,reply\nمرحبا,هلا\n", "csv", "words")
+    assert rows == [("مرحبا", "هلا")] and not report.errors
+
+
+def test_downloaded_json_files_round_trip():
+    assert guess_format("words.json") == "json"
+    rows, _ = parse(json.dumps({"مرحبا": "هلا", "بوت": "أنا هنا"}, ensure_ascii=False), "json", "words")
+    assert rows == [("مرحبا", "هلا"), ("بوت", "أنا هنا")]
+    rows, _ = parse(json.dumps({"forbidden": ["شتيمة"], "warning": "x"}, ensure_ascii=False), "json", "forbidden")
+    assert rows == [("شتيمة",)]
+
+
+def test_strict_mode_aborts_on_any_error():
+    with pytest.raises(BulkImportError):
+        parse('{"key": "a", "reply": "b"}\n{"key": 1}\n', "jsonl", "words", strict=True)
+
+
+def test_invalid_encoding_aborts():
+    report = ImportReport()
+    with pytest.raises(BulkImportError):
+        list(parse_batches(io.BytesIO(b"ok\n\xff\xfe\n"), "csv", "forbidden", report))
+    assert report.aborted
+
+
+def test_export_formats():
+    rows = [("مرحبا", "هلا")]
+    assert "".join(format_rows(rows, "jsonl", "words")) == '{"key": "مرحبا", "reply": "هلا"}\n'
+    assert "".join(format_rows(rows, "csv", "words")) == "\ufeffkey,reply\r\nمرحبا,هلا\r\n"
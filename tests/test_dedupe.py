@@ -0,0 +1,10 @@
+from dedupe import SeenEvents
+
+
+def test_forget_allows_redelivery(tmp_path):
+    for seen in (SeenEvents(), SeenEvents(path=str(tmp_path / "seen.db"))):
+        assert not seen.seen("e1")
+        assert seen.seen("e1")
+        seen.forget("e1")
+        assert not seen.seen("e1")
+        assert seen.duplicates == 1
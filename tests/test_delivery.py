@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from delivery import ReplyDelivery, CircuitBreaker
+
+
+class Throttled(Exception):
+    status = 429
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.headers = {"Retry-After": retry_after}
+
+
+def sender(*errors):
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+
+    return send, calls
+
+
+def test_retry_after_within_max_delay_is_honoured():
+    send, calls = sender(Throttled("0.05"))
+    start = time.monotonic()
+    assert ReplyDelivery(max_delay=1).deliver(send, time.time() + 50) == (True, "success")
+    assert len(calls) == 2 and time.monotonic() - start >= 0.05
+
+
+def test_retry_after_beyond_max_delay_drops_without_sleeping():
+    send, calls = sender(Throttled("30"))
+    start = time.monotonic()
+    assert ReplyDelivery(max_delay=4).deliver(send, time.time() + 50) == (False, "throttled")
+    assert len(calls) == 1 and time.monotonic() - start < 0.5
+
+
+def test_open_breaker_drops_immediately():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    breaker.failure()
+    send, calls = sender()
+    assert ReplyDelivery(breaker=breaker).deliver(send, time.time() + 50) == (False, "circuit_open")
+    assert not calls
+
+
+class Rejected(Exception):
+    status = 400
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    breaker.failure()
+    return breaker
+
+
+def test_half_open_trial_is_released_on_every_exit():
+    for error, outcome in ((Rejected(), "rejected"), (Throttled("30"), "throttled")):
+        breaker = half_open_breaker()
+        send, _ = sender(error)
+        assert ReplyDelivery(breaker=breaker).deliver(send, time.time() + 50) == (False, outcome)
+        assert breaker.state == "closed"
+        assert ReplyDelivery(breaker=breaker).deliver(send, time.time() + 50) == (True, "success")
+
+    breaker = half_open_breaker()
+    send, _ = sender(Throttled("0"), Throttled("0"))
+    assert ReplyDelivery(max_attempts=2, breaker=breaker).deliver(send, time.time() + 50) == (False, "exhausted")
+    assert breaker.state == "closed"
+
+    breaker = half_open_breaker()
+    send, calls = sender(KeyError("bug"))
+    with pytest.raises(KeyError):
+        ReplyDelivery(breaker=breaker).deliver(send, time.time() + 50)
+    assert ReplyDelivery(breaker=breaker).deliver(send, time.time() + 50) == (True, "success")
+    assert len(calls) == 2
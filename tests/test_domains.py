@@ -0,0 +1,64 @@
+import time
+
+from domains import DomainTrie, iter_hosts
+
+
+def trie(*rules):
+    t = DomainTrie()
+    for rule in rules:
+        if isinstance(rule, tuple):
+            t.add(*rule)
+        else:
+            t.add(rule)
+    return t
+
+
+def test_rule_covers_domain_and_subdomains():
+    t = trie("spam.example")
+    assert t.lookup("spam.example") == ("block", "spam.example")
+    assert t.lookup("a.b.spam.example") == ("block", "spam.example")
+    assert t.lookup("notspam.example") is None
+    assert t.lookup("example") is None
+
+
+def test_wildcard_rule_covers_subdomains_only():
+    t = trie("*.spam.example")
+    assert t.lookup("spam.example") is None
+    assert t.lookup("www.spam.example") == ("block", "*.spam.example")
+
+
+def test_most_specific_rule_wins_and_allow_breaks_ties():
+    t = trie("spam.example", ("ok.spam.example", "allow"))
+    assert t.lookup("ok.spam.example")[0] == "allow"
+    assert t.lookup("x.ok.spam.example")[0] == "allow"
+    assert t.lookup("bad.spam.example")[0] == "block"
+    t = trie("spam.example", ("spam.example", "allow"))
+    assert t.lookup("spam.example")[0] == "allow"
+
+
+def test_find_extracts_host_from_urls():
+    t = trie("spam.example")
+    for text in ("visit https://www.Spam.Example/path?x=1", "mail me@spam.example.",
+                 "https://user:pw@spam.example:8080/", "a..spam.example"):
+        m = t.find(text)
+        assert m is not None and m.term == "spam.example", text
+        assert text[m.start:m.end].lower().endswith("spam.example")
+    assert t.find("nothing to see, google.com") is None
+
+
+def test_idn_hosts_are_matched_as_punycode():
+    t = trie("مثال.إختبار")
+    assert t.find("زوروا مثال.إختبار الآن") is not None
+
+
+def test_non_hosts_are_ignored():
+    assert list(iter_hosts("1.2.3.4 v2.0 a.")) == []
+
+
+def test_long_tokens_scan_in_linear_time():
+    t = trie("spam.example")
+    start = time.perf_counter()
+    for text in ("a." * 2500, "a" * 5000, "-" * 5000):
+        assert t.find(text) is None
+    assert t.find("a." * 2500 + "spam.example") is not None
+    assert time.perf_counter() - start < 0.1
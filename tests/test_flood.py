@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+import flood
+from flood import RepeatDetector
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(flood, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_sliding_window_weights_previous_window(clock):
+    d = RepeatDetector(window=60)
+    assert [d.hit("C1:U1", "ad") for _ in range(3)] == [1, 2, 3]
+    clock[0] += 60
+    assert d.hit("C1:U1", "ad") == 4          # السابقة كاملة في بداية النافذة الجديدة
+    clock[0] += 30
+    assert d.hit("C1:U1", "ad") == 2 + 3 * 0.5
+    clock[0] += 150
+    assert d.hit("C1:U1", "ad") == 1          # أكثر من نافذتين: لا شيء يبقى
+
+
+def test_counts_are_per_scope_and_text(clock):
+    d = RepeatDetector(window=60)
+    d.hit("C1:U1", "ad")
+    assert d.hit("C1:U2", "ad") == 1
+    assert d.hit("C1:U1", "other") == 1
+    assert d.hit("C1:U1", "ad") == 2
+
+
+def test_least_recently_used_keys_are_evicted(clock):
+    d = RepeatDetector(window=60, max_keys=2)
+    d.hit("a", 1)
+    d.hit("b", 1)
+    d.hit("a", 1)
+    d.hit("c", 1)
+    assert len(d) == 2
+    assert d.hit("a", 1) == 3
+    assert d.hit("b", 1) == 1
+
+
+def test_find_repeated_flags_after_max_repeats(load_helper):
+    helper = load_helper()
+    text = "اشترك في قناتي الآن"
+    assert [helper.find_repeated(text, "C1", "U1") for _ in range(3)] == [None, None, None]
+    hit = helper.find_repeated("اشترِك في قناتي الآن", "C1", "U1")   # نفس النص بعد التطبيع
+    assert hit is not None and hit.term == "repeat" and hit.value == 4
+    assert helper.find_repeated(text, "C1", "U2") is None
+    assert all(helper.find_repeated("شكرا", "C1", "U1") is None for _ in range(10))
+    assert helper.find_repeated(text, None, "U1") is None
@@ -0,0 +1,55 @@
+import json
+
+from replies import ReplyEngine, OverlayEngine
+
+
+def test_overlay_rules_come_before_base_rules():
+    base = ReplyEngine({"مرحبا": "عام"}, {"بوت": "أنا هنا"}, fallback="رد عام")
+    group = OverlayEngine(ReplyEngine({"مرحبا": "قروب"}, {"الدوام": "من ٨"}), base)
+    assert group.match("مرحبا").text == "قروب"
+    assert group.match("متى الدوام").text == "من ٨"
+    assert group.match("يا بوت").text == "أنا هنا"
+    assert group.match("لا شيء") == ("رد عام", "fallback", None)
+    assert group.match("لا شيء", use_fallback=False) is None
+
+
+def test_group_fallback_replaces_global_fallback():
+    base = ReplyEngine(fallback="رد عام")
+    assert OverlayEngine(ReplyEngine(fallback="رد القروب"), base).match("x").text == "رد القروب"
+
+
+def write_groups(tmp_path, groups):
+    path = tmp_path / "groups.json"
+    path.write_text(json.dumps(groups, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_group_rules_apply_only_to_their_group(load_helper, tmp_path):
+    write_groups(tmp_path, {"C1": {"exact": {"مرحبا": "هلا بالقروب"}, "forbidden": ["كلمة"], "warning": "تنبيه القروب"}})
+    helper = load_helper()
+    assert helper.get_auto_reply("مرحبا", source_id="C1") == "هلا بالقروب"
+    assert helper.get_auto_reply("مرحبا", source_id="C2") == "هلا والله!"
+    assert helper.get_auto_reply("مرحبا") == "هلا والله!"
+    assert helper.find_forbidden("هذه كلمة", source_id="C1").value == "كلمة"
+    assert helper.find_forbidden("هذه كلمة", source_id="C2") is None
+    assert helper.find_forbidden("هذه شتيمة", source_id="C1") is not None   # القائمة العامة تبقى
+    assert helper.get_warning_message("C1") == "تنبيه القروب"
+    assert helper.get_warning_message("C2") != "تنبيه القروب"
+
+
+def test_evicted_overlays_are_recompiled(load_helper, tmp_path):
+    write_groups(tmp_path, {"C1": {"exact": {"مرحبا": "واحد"}}, "C2": {"exact": {"مرحبا": "اثنان"}}})
+    helper = load_helper(GROUP_CACHE_SIZE="1")
+    for _ in range(3):
+        assert helper.get_auto_reply("مرحبا", source_id="C1") == "واحد"
+        assert helper.get_auto_reply("مرحبا", source_id="C2") == "اثنان"
+    assert len(helper._GROUP_CACHE) == 1
+
+
+def test_groups_file_edits_are_picked_up(load_helper, tmp_path):
+    path = write_groups(tmp_path, {"C1": {"exact": {"مرحبا": "قديم"}}})
+    helper = load_helper()
+    assert helper.get_auto_reply("مرحبا", source_id="C1") == "قديم"
+    write_groups(tmp_path, {"C1": {"exact": {"مرحبا": "جديد"}}})
+    helper.notify_changed(path)
+    assert helper.get_auto_reply("مرحبا", source_id="C1") == "جديد"
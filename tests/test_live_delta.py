@@ -0,0 +1,69 @@
+# التعديلات الحيّة من سجل القاعدة يجب أن تعطي نفس حالة البناء الكامل
+import random
+
+import pytest
+
+
+@pytest.fixture
+def helper(load_helper):
+    module = load_helper()
+    module._load_engine()
+    module._load_mod()
+    return module
+
+
+def word_state(h):
+    exact, contains, _, _ = h._E_INPUTS
+    return dict(h._WORDS), dict(exact), dict(contains), dict(h._ENGINE.exact), h._ENGINE.contains.items()
+
+
+def rebuilt_word_state(h):
+    groups, _, (exact, contains, _, _), engine = h._build_engine()
+    return h._effective(groups), dict(exact), dict(contains), dict(engine.exact), engine.contains.items()
+
+
+def mod_state(mod):
+    return {k: list(v) for k, v in mod["forbidden"].items()}, mod["automaton"].items()
+
+
+def test_deleting_variant_keeps_existing_word(helper):
+    store = helper.get_store()
+    store.upsert_word("مَرحبا", "أهلين")
+    assert helper.get_auto_reply("مرحبا") == "أهلين"
+    store.delete_word("مَرحبا")
+    assert helper.get_auto_reply("مرحبا") == "هلا والله!"
+    assert word_state(helper) == rebuilt_word_state(helper)
+
+
+def test_removing_variant_keeps_existing_forbidden_term(helper):
+    helper.add_forbidden_term("شَتيمة")
+    helper.remove_forbidden_term("شَتيمة")
+    assert helper.find_forbidden("هذه شتيمة") is not None
+    assert mod_state(helper._MOD) == mod_state(helper._build_mod(helper.get_store())[0])
+
+
+def test_random_edits_match_full_rebuild(helper):
+    rnd = random.Random(7)
+    store = helper.get_store()
+    variants = ["مرحبا", "مَرحبا", "مرحبآ", "بوت", "بُوت", "شكرا", "شكراً"]
+    for step in range(200):
+        key = rnd.choice(variants)
+        if rnd.random() < 0.6:
+            store.upsert_word(key, f"r{step}")
+            helper.add_forbidden_term(key)
+        else:
+            store.delete_word(key)
+            helper.remove_forbidden_term(key)
+        if step % 10 == 0:
+            helper._load_engine()
+            helper._load_mod()
+    helper._load_engine()
+    helper._load_mod()
+    assert word_state(helper) == rebuilt_word_state(helper)
+    assert mod_state(helper._MOD) == mod_state(helper._build_mod(store)[0])
+
+
+def test_legacy_contains_key_matches_after_normalization(helper):
+    helper.get_store().upsert_word("مساعدة", "كيف أساعدك؟")
+    assert helper.get_auto_reply("ابي مساعدة لو سمحت") == "كيف أساعدك؟"
+    assert word_state(helper) == rebuilt_word_state(helper)
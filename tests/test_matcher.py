@@ -0,0 +1,70 @@
+from matcher import AhoCorasick
+
+
+def terms(automaton, text):
+    return [m.term for m in automaton.iter_matches(text)]
+
+
+def test_find_returns_leftmost_match_with_value():
+    ac = AhoCorasick({"he": 1, "she": 2, "hers": 3})
+    m = ac.find("ushers")
+    assert (m.term, m.start, m.end, m.value) == ("she", 1, 4, 2)
+
+
+def test_overlapping_terms_are_all_reported():
+    ac = AhoCorasick()
+    for term in ("سب", "سبام", "بام"):
+        ac.add(term)
+    ac.build()
+    assert sorted(terms(ac, "هذا سبام")) == ["بام", "سب", "سبام"]
+
+
+def test_empty_automaton_matches_nothing():
+    ac = AhoCorasick()
+    assert not ac and ac.find("أي نص") is None
+
+
+def test_insert_new_term_on_built_automaton():
+    ac = AhoCorasick({"foo": "a"})
+    ac.insert("bar", "b")
+    assert terms(ac, "foo bar") == ["foo", "bar"]
+    assert ac.items() == {"foo": "a", "bar": "b"}
+
+
+def test_insert_existing_term_updates_value():
+    ac = AhoCorasick({"foo": "a"})
+    ac.insert("foo", "b")
+    assert ac.find("xfoo").value == "b"
+
+
+def test_remove_and_reinsert():
+    ac = AhoCorasick({"foo": "a", "bar": "b"})
+    assert ac.remove("foo")
+    assert ac.find("foo") is None
+    assert not ac.remove("foo")
+    ac.insert("foo", "c")
+    assert ac.find("foo").value == "c"
+
+
+def test_remove_delta_term():
+    ac = AhoCorasick({"foo": "a"})
+    ac.insert("baz", "z")
+    assert ac.remove("baz")
+    assert ac.find("baz") is None
+    assert ac.items() == {"foo": "a"}
+
+
+def test_many_inserts_compact_and_keep_all_terms():
+    ac = AhoCorasick({"base": 0})
+    words = [f"w{i:03d}x" for i in range(300)]
+    for i, w in enumerate(words):
+        ac.insert(w, i)
+    ac.remove("base")
+    assert ac.items() == {w: i for i, w in enumerate(words)}
+    assert terms(ac, "w007x base w299x") == ["w007x", "w299x"]
+
+
+def test_matches_from_base_and_delta_are_ordered_by_position():
+    ac = AhoCorasick({"zzz": 1})
+    ac.insert("aaa", 2)
+    assert terms(ac, "aaa zzz aaa") == ["aaa", "zzz", "aaa"]
@@ -0,0 +1,39 @@
+import os
+import json
+
+from metrics import Registry
+
+
+def dead_pid():
+    pid = 4_000_000
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid += 1
+
+
+def write_snapshot(directory, pid, start, value):
+    snap = {"pid": pid, "start": start, "counters": [["linebot_events_total", [["type", "message"]], value]],
+            "gauges": [["linebot_queue_size", [], 7]], "histograms": []}
+    (directory / f"metrics-{pid}-{start}.json").write_text(json.dumps(snap), encoding="utf-8")
+
+
+def test_dead_workers_are_folded_and_counters_never_decrease(tmp_path):
+    write_snapshot(tmp_path, dead_pid(), 1, 5)
+    write_snapshot(tmp_path, os.getpid(), 1, 3)   # عامل سابق بنفس pid الحالي
+    registry = Registry(directory=str(tmp_path), flush_interval=3600)
+    registry.inc("linebot_events_total", type="message")
+    registry._fold_dead()
+
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["metrics-dead.json"]
+    text = registry.render()
+    assert 'linebot_events_total{type="message"} 9' in text
+    assert "linebot_queue_size" not in text
+
+    registry.flush()
+    registry._fold_dead()
+    assert 'linebot_events_total{type="message"} 9' in registry.render()
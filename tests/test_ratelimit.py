@@ -0,0 +1,60 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucketLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_burst_then_refill_reports_suppressed_count(clock):
+    limiter = TokenBucketLimiter(per_minute=6, burst=2)
+    assert limiter.take("C1") == (True, 0)
+    assert limiter.take("C1") == (True, 0)
+    assert limiter.take("C1") == (False, 1)
+    assert limiter.take("C1") == (False, 2)
+    assert limiter.take("C2") == (True, 0)   # كل مصدر بحدّه
+    clock[0] += 10                            # 6 في الدقيقة = رمز كل 10 ثوانٍ
+    assert limiter.take("C1") == (True, 2)
+    assert limiter.take("C1") == (False, 1)
+
+
+def test_zero_rate_means_unlimited(clock):
+    limiter = TokenBucketLimiter(per_minute=0, burst=1)
+    assert all(limiter.take("C1") == (True, 0) for _ in range(100))
+    assert len(limiter) == 0
+
+
+def test_least_recently_used_sources_are_evicted(clock):
+    limiter = TokenBucketLimiter(per_minute=1, burst=1, max_keys=2)
+    limiter.take("C1")
+    limiter.take("C2")
+    limiter.take("C1")
+    limiter.take("C3")
+    assert len(limiter) == 2
+    assert limiter.take("C1") == (False, 2)   # استُخدم مؤخرًا فبقي
+    assert limiter.take("C2") == (True, 0)    # الأقدم حُذف فبدأ من جديد
+
+
+def test_configure_keeps_existing_buckets(clock):
+    limiter = TokenBucketLimiter(per_minute=1, burst=1)
+    limiter.take("C1")
+    limiter.configure(per_minute=1, burst=1, max_keys=10)
+    assert limiter.take("C1") == (False, 1)
+
+
+def test_limits_come_from_moderation_json(load_helper, tmp_path):
+    (tmp_path / "moderation.json").write_text(json.dumps({
+        "forbidden": ["شتيمة"], "rate_limit": {"warnings_per_minute": 1, "warnings_burst": 1},
+    }, ensure_ascii=False), encoding="utf-8")
+    helper = load_helper()
+    assert helper.allow_warning("C1") == (True, 0)
+    assert helper.allow_warning("C1") == (False, 1)
+    assert helper.allow_reply("C1")
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from reloader import FileWatcher
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.mark.parametrize("mode", ["poll", "auto"])
+def test_version_changes_when_file_is_rewritten(tmp_path, mode):
+    path = tmp_path / "words.json"
+    path.write_text("{}", encoding="utf-8")
+    watcher = FileWatcher(mode=mode, poll_interval=0.02)
+    v1 = watcher.version(str(path))
+    assert watcher.version(str(path)) == v1
+
+    path.write_text('{"مرحبا": "هلا"}', encoding="utf-8")
+    assert wait_for(lambda: watcher.version(str(path)) != v1)
+
+
+def test_missing_file_is_picked_up_when_created(tmp_path):
+    path = tmp_path / "replies.json"
+    watcher = FileWatcher(mode="poll", poll_interval=0.02)
+    v1 = watcher.version(str(path))
+    path.write_text("{}", encoding="utf-8")
+    assert wait_for(lambda: watcher.version(str(path)) != v1)
+
+
+def test_notify_bumps_version_immediately(tmp_path):
+    path = tmp_path / "moderation.json"
+    path.write_text("{}", encoding="utf-8")
+    watcher = FileWatcher(mode="poll", poll_interval=3600)
+    v1 = watcher.version(str(path))
+    watcher.notify(str(path))
+    assert watcher.version(str(path)) == v1 + 1
+
+
+def test_version_does_not_touch_the_disk(tmp_path, monkeypatch):
+    path = tmp_path / "words.json"
+    path.write_text("{}", encoding="utf-8")
+    watcher = FileWatcher(mode="poll", poll_interval=3600)
+    watcher.version(str(path))
+
+    import reloader
+    monkeypatch.setattr(reloader, "_signature", lambda p: pytest.fail("stat on the message path"))
+    for _ in range(100):
+        watcher.version(str(path))
@@ -0,0 +1,55 @@
+from replies import ReplyEngine
+
+
+def engine(**sections):
+    return ReplyEngine(sections.get("exact"), sections.get("contains"), sections.get("regex"), sections.get("fallback"))
+
+
+def test_strategies_are_tried_in_order():
+    e = engine(exact={"مرحبا": "exact"}, contains={"مرحبا": "contains", "بوت": "bot"},
+               regex={"^مرح": "regex"}, fallback="fallback")
+    assert e.match("مرحبا") == ("exact", "exact", "مرحبا")
+    assert e.match("مرحبا يا بوت") == ("contains", "contains", "مرحبا")
+    assert e.match("مرحىىى").strategy == "regex"
+    assert e.match("لا شيء") == ("fallback", "fallback", None)
+    assert e.match("لا شيء", use_fallback=False) is None
+
+
+def test_contains_prefers_earliest_term_in_message():
+    e = engine(contains={"شكرا": "thanks", "بوت": "bot"})
+    assert e.match("يا بوت شكرا").key == "بوت"
+
+
+def test_merged_regex_prefers_earliest_match_then_file_order():
+    e = engine(regex={r"\d+ ريال": "price", r"سعر": "price-word", r"س\w+": "s-word"})
+    assert e.match("كم سعر 5 ريال").key == "سعر"
+    assert e.match("5 ريال سعر").key == r"\d+ ريال"
+    assert e.match("يا سلام").key == r"س\w+"
+
+
+def test_unmergeable_patterns_are_matched_on_their_own():
+    e = engine(regex={r"(?P<n>\d+) كيلو": "named", r"(\w)\1\1": "repeat", r"(?i)hello": "flag",
+                      r"[": "invalid"})
+    assert e.match("10 كيلو").key == r"(?P<n>\d+) كيلو"
+    assert e.match("ههههه").key == r"(\w)\1\1"
+    assert e.match("hello there").key == "(?i)hello"
+    assert e.match("[") is None
+
+
+def test_regex_ignores_latin_case():
+    assert engine(regex={"OK": "ok"}).match("ok يا بوت").key == "OK"
+
+
+def test_rules_are_checked_one_by_one_if_merging_fails(monkeypatch):
+    import replies
+    compile_ = replies.re.compile
+
+    def failing(pattern, flags=0):
+        if pattern.startswith("(?P<r0>"):
+            raise replies.re.error("merge failed")
+        return compile_(pattern, flags)
+
+    monkeypatch.setattr(replies.re, "compile", failing)
+    e = engine(regex={"سعر": "price", r"\d+": "number"})
+    assert e.match("5").key == r"\d+"
+    assert e.match("السعر 5").key == "سعر"
@@ -0,0 +1,50 @@
+import json
+
+from cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1}
+
+
+def test_zero_size_disables_cache():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a", "miss") == "miss" and len(cache) == 0
+
+
+def test_cached_replies_follow_store_edits(load_helper):
+    helper = load_helper(REPLY_CACHE_SIZE="64")
+    assert helper.get_auto_reply("مرحبا") == "هلا والله!"
+    assert helper.get_auto_reply("غير موجود") is None
+    hits = helper._REPLY_CACHE.hits
+    assert helper.get_auto_reply("مرحبا") == "هلا والله!"
+    assert helper.get_auto_reply("غير موجود") is None   # "لا رد" يُخزّن أيضًا
+    assert helper._REPLY_CACHE.hits == hits + 2
+
+    store = helper.get_store()
+    store.upsert_word("مرحبا", "أهلين")
+    store.upsert_word("غير موجود", "صار موجود")
+    assert helper.get_auto_reply("مرحبا") == "أهلين"
+    assert helper.get_auto_reply("غير موجود") == "صار موجود"
+
+
+def test_cached_replies_follow_file_edits(load_helper, tmp_path):
+    helper = load_helper(STORE_BACKEND="json", REPLY_CACHE_SIZE="64")
+    assert helper.get_auto_reply("مرحبا") == "هلا والله!"
+    path = tmp_path / "words.json"
+    path.write_text(json.dumps({"مرحبا": "أهلين"}, ensure_ascii=False), encoding="utf-8")
+    helper.notify_changed(str(path))
+    assert helper.get_auto_reply("مرحبا") == "أهلين"
+
+
+def test_time_commands_are_not_cached(load_helper):
+    helper = load_helper(REPLY_CACHE_SIZE="64")
+    helper.get_auto_reply("!time")
+    assert len(helper._REPLY_CACHE) == 0
@@ -0,0 +1,36 @@
+from search import KeyIndex
+
+
+def keys(result):
+    return [k for k, _ in result[1]]
+
+
+def test_contains_search_is_normalized():
+    idx = KeyIndex({"مرحبا": "هلا", "السلام عليكم": "وعليكم", "مع السلامة": "باي"})
+    assert keys(idx.search("سلام")) == ["السلام عليكم", "مع السلامة"]
+    assert keys(idx.search("مَرحبا")) == ["مرحبا"]
+
+
+def test_prefix_search_is_sorted():
+    idx = KeyIndex(["بوت", "باي", "بحث", "سلام"])
+    total, rows = idx.search("ب", mode="prefix")
+    assert total == 3
+    assert [k for k, _ in rows] == ["باي", "بحث", "بوت"]
+
+
+def test_pagination_and_total():
+    idx = KeyIndex([f"key{i:02d}" for i in range(25)])
+    total, rows = idx.search("key", offset=20, limit=10)
+    assert total == 25 and len(rows) == 5
+    assert idx.search("", offset=0, limit=3) == (25, [("key00", None), ("key01", None), ("key02", None)])
+
+
+def test_no_match():
+    assert KeyIndex(["abc"]).search("xyz") == (0, [])
+
+
+def test_single_character_contains_search():
+    idx = KeyIndex(["بوت", "باي", "سلام", "مساء"])
+    assert keys(idx.search("ي")) == ["باي"]
+    assert keys(idx.search("س")) == ["سلام", "مساء"]
+    assert keys(idx.search("ي", mode="prefix")) == []
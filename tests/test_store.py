@@ -0,0 +1,67 @@
+import pytest
+
+from store import KeywordStore
+
+
+def test_revision_is_cached_until_local_write(tmp_path):
+    path = str(tmp_path / "bot.db")
+    store = KeywordStore(path, revision_ttl=60)
+    other = KeywordStore(path)   # عامل آخر على نفس الملف
+    assert store.revision("words") == 0
+
+    other.upsert_word("مرحبا", "هلا")
+    assert store.revision("words") == 0
+    assert store.revision("words", fresh=True) == 1
+
+    store.add_forbidden("شتيمة")
+    assert store.revision("words") == 1
+    assert store.revision("forbidden") == 2
+
+
+def test_revision_without_ttl_reads_database(tmp_path):
+    path = str(tmp_path / "bot.db")
+    store, other = KeywordStore(path), KeywordStore(path)
+    other.upsert_word("مرحبا", "هلا")
+    assert store.revision("words") == 1
+
+
+def test_bulk_import_counts_only_real_changes(tmp_path):
+    store = KeywordStore(str(tmp_path / "bot.db"))
+    store.upsert_word("مرحبا", "هلا")
+    store.upsert_word("بوت", "أنا هنا")
+    assert store.bulk_import("words", [[("مرحبا", "هلا"), ("باي", "مع السلامة")]]) == 1
+    # استبدال: "بوت" حُذف و "مرحبا" تغيّر، و "باي" كما هو
+    assert store.bulk_import("words", [[("مرحبا", "أهلين"), ("باي", "مع السلامة")]], replace=True) == 2
+    assert store.words() == {"مرحبا": "أهلين", "باي": "مع السلامة"}
+    assert store.bulk_import("words", [[("مرحبا", "أهلين"), ("باي", "مع السلامة")]], replace=True) == 0
+
+    store.add_forbidden("شتيمة")
+    assert store.bulk_import("forbidden", [[("شتيمة",), ("كلمة",)]], replace=True) == 1
+    assert store.forbidden() == ["شتيمة", "كلمة"]
+
+
+def test_bulk_import_parses_before_taking_the_write_lock(tmp_path):
+    path = str(tmp_path / "bot.db")
+    store, other = KeywordStore(path), KeywordStore(path)
+
+    def batches():
+        yield [("مرحبا", "هلا")]
+        assert other.upsert_word("بوت", "أنا هنا")   # عامل آخر يكتب أثناء قراءة الملف
+        yield [("باي", "مع السلامة")]
+
+    assert store.bulk_import("words", batches()) == 2
+    assert store.words() == {"بوت": "أنا هنا", "مرحبا": "هلا", "باي": "مع السلامة"}
+
+
+def test_failed_import_writes_nothing(tmp_path):
+    store = KeywordStore(str(tmp_path / "bot.db"))
+
+    def batches():
+        yield [("مرحبا", "هلا")]
+        raise ValueError("ملف غير صالح")
+
+    with pytest.raises(ValueError):
+        store.bulk_import("words", batches())
+    assert store.words() == {} and store.revision("words") == 0
+    assert store.bulk_import("words", [[("باي", "مع السلامة")]]) == 1
+    assert store.words() == {"باي": "مع السلامة"}
@@ -0,0 +1,70 @@
+# worker.py
+# طابور داخلي محدود بأولويات + مجموعة خيوط لمعالجة أحداث الويبهوك بعد الرد على LINE
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class EventQueue:
+    """
+    submit(event, priority) لا يحجب: يضع الحدث في طابور محدود ويعود فورًا.
+    الخيوط تسحب الأصغر priority أولًا، وبترتيب الوصول داخل الأولوية نفسها.
+    الخيوط تُشغَّل عند أول submit داخل كل عملية (آمن مع fork في gunicorn).
+    الأحداث الأقدم من max_age ثانية تُسقط لأن reply token غالبًا انتهت صلاحيته.
+    """
+
+    def __init__(self, handle, workers: int = 4, maxsize: int = 1000, max_age: float = 50.0):
+        self.handle = handle
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._seq = itertools.count()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # عملية جديدة (أول تشغيل أو بعد fork): طابور وخيوط جديدة
+            self._queue = queue.PriorityQueue(maxsize=self.maxsize)
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+                t.start()
+            self._pid = os.getpid()
+
+    def submit(self, event, priority: int = 0) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((priority, next(self._seq), time.monotonic(), event))
+            return True
+        except queue.Full:
+            self.dropped_full += 1
+            return False
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _run(self):
+        q = self._queue
+        while True:
+            _, _, enqueued, event = q.get()
+            try:
+                if time.monotonic() - enqueued > self.max_age:
+                    self.dropped_stale += 1
+                    continue
+                self.handle(event)
+            except Exception:
+                log.exception("فشل معالجة حدث الويبهوك")
+            finally:
+                q.task_done()